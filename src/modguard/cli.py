@@ -7,13 +7,6 @@ import os
 import sys
 from typing import Dict, List, Optional
 
-from modguard.dependency.graph import DependencyGraphBuilder
-from modguard.detector.collision_detector import CollisionDetector
-from modguard.extractor.module_extractor import ModuleExtractor
-from modguard.fix.engine import FixEngine
-from modguard.models.conflict import ConflictReport, DetailedConflictReport
-from modguard.models.fix_plan import FixPlan
-
 
 def setup_logging(verbose: bool = False) -> None:
     """Set up logging configuration."""
@@ -35,6 +28,12 @@ def scan_command(args) -> int:
     Returns:
         Exit code (0 for success, non-zero for failure)
     """
+    # Imported here so that --help and argument errors don't pay for them
+    from modguard.dependency.graph import DependencyGraphBuilder
+    from modguard.detector.collision_detector import CollisionDetector
+    from modguard.extractor.module_extractor import ModuleExtractor
+    from modguard.fix.engine import FixEngine
+    
     project_path = args.path or os.getcwd()
     logging.info(f"Scanning project at {project_path}...")
     
@@ -56,6 +55,9 @@ def scan_command(args) -> int:
     logging.info("Detecting module namespace collisions...")
     detailed_report = CollisionDetector.scan_project(project_path, modules_by_package)
     
+    # The report keeps only the conflicting modules; let the full listings go
+    del graph, modules_by_package
+    
     if not detailed_report.has_conflicts():
         logging.info("No module namespace collisions detected.")
         return 0
@@ -1,26 +1,44 @@
 """
 Build and analyze dependency graphs for Python projects.
 """
+import codecs
+import functools
 import os
 import re
+import sys
+from array import array
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib
 
 from modguard.models.conflict import PackageInfo
 
+# Requirement specifier: package name followed by an optional version constraint
+_REQ_RE = re.compile(r'^([^<>=!~]+)(?:[<>=!~]=?|$)(.*)$')
+
+
+@functools.lru_cache(maxsize=1024)
+def _intern_package(name: str, version: str) -> PackageInfo:
+    """Get a shared PackageInfo for a name and version, creating it on first use."""
+    return PackageInfo(name=name, version=version)
+
 
 class DependencyNode:
     """A node in the dependency graph representing a package."""
     
     def __init__(self, package: PackageInfo):
         self.package = package
-        self.dependencies: List[DependencyNode] = []
+        # Package name -> node, keeping insertion order
+        self.dependencies: Dict[str, DependencyNode] = {}
     
     def add_dependency(self, node: 'DependencyNode') -> None:
         """Add a dependency to this node."""
-        if node not in self.dependencies:
-            self.dependencies.append(node)
+        self.dependencies.setdefault(node.package.name, node)
     
     def __eq__(self, other):
         if not isinstance(other, DependencyNode):
@@ -39,11 +57,23 @@ class DependencyGraph:
     
     def __init__(self):
         self.nodes: Dict[str, DependencyNode] = {}
+        # The project the graph was built for, if any; it is not a dependency itself
+        self.root: Optional[PackageInfo] = None
+        # Package name -> transitive dependencies, cleared whenever the graph changes
+        self._transitive_cache: Dict[str, FrozenSet[PackageInfo]] = {}
+        # Integer-indexed adjacency (names, ids, indptr, indices), rebuilt lazily
+        self._csr: Optional[Tuple[List[str], Dict[str, int], array, array]] = None
+    
+    def _invalidate_caches(self) -> None:
+        """Drop derived structures after the graph has been modified."""
+        self._transitive_cache.clear()
+        self._csr = None
     
     def add_node(self, package: PackageInfo) -> DependencyNode:
         """Add a node to the graph if it doesn't exist."""
         if package.name not in self.nodes:
             self.nodes[package.name] = DependencyNode(package)
+            self._invalidate_caches()
         return self.nodes[package.name]
     
     def add_dependency(self, parent: PackageInfo, child: PackageInfo) -> None:
@@ -51,6 +81,7 @@ class DependencyGraph:
         parent_node = self.add_node(parent)
         child_node = self.add_node(child)
         parent_node.add_dependency(child_node)
+        self._invalidate_caches()
     
     def get_all_packages(self) -> List[PackageInfo]:
         """Get all packages in the graph."""
@@ -60,35 +91,70 @@ class DependencyGraph:
         """Get direct dependencies of a package."""
         if package_name not in self.nodes:
             return []
-        return [node.package for node in self.nodes[package_name].dependencies]
+        return [node.package for node in self.nodes[package_name].dependencies.values()]
     
-    def get_all_dependencies(self, package_name: str) -> Set[PackageInfo]:
-        """Get all dependencies (direct and transitive) of a package."""
+    def _build_csr(self) -> Tuple[List[str], Dict[str, int], array, array]:
+        """
+        Build a compressed sparse row view of the graph.
+        
+        Nodes are numbered in insertion order; the dependencies of node i are
+        indices[indptr[i]:indptr[i + 1]]. The result is cached until the graph
+        is modified.
+        """
+        if self._csr is None:
+            names = list(self.nodes)
+            ids = {name: i for i, name in enumerate(names)}
+            indptr = array('l', [0])
+            indices = array('l')
+            for name in names:
+                indices.extend(ids[dep_name] for dep_name in self.nodes[name].dependencies)
+                indptr.append(len(indices))
+            self._csr = (names, ids, indptr, indices)
+        return self._csr
+    
+    @staticmethod
+    def _reach(indptr: array, indices: array, root: int) -> bytearray:
+        """Mark every node reachable from root through at least one edge."""
+        reached = bytearray(len(indptr) - 1)
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            # Index into indices directly; slicing would copy the adjacency
+            for i in range(indptr[node], indptr[node + 1]):
+                dep = indices[i]
+                if not reached[dep]:
+                    reached[dep] = 1
+                    stack.append(dep)
+        return reached
+    
+    def get_all_dependencies(self, package_name: str) -> FrozenSet[PackageInfo]:
+        """
+        Get all dependencies (direct and transitive) of a package.
+        
+        Results are memoized until the graph is next modified.
+        """
         if package_name not in self.nodes:
-            return set()
+            return frozenset()
         
-        result = set()
-        to_visit = [self.nodes[package_name]]
-        visited = set()
+        cached = self._transitive_cache.get(package_name)
+        if cached is not None:
+            return cached
         
-        while to_visit:
-            node = to_visit.pop()
-            if node in visited:
-                continue
-                
-            visited.add(node)
-            for dep in node.dependencies:
-                result.add(dep.package)
-                if dep not in visited:
-                    to_visit.append(dep)
+        # Traverse integer ids instead of node objects
+        names, ids, indptr, indices = self._build_csr()
+        reached = self._reach(indptr, indices, ids[package_name])
         
-        return result
+        frozen = frozenset(
+            self.nodes[names[i]].package for i, is_reached in enumerate(reached) if is_reached
+        )
+        self._transitive_cache[package_name] = frozen
+        return frozen
     
     def __str__(self) -> str:
         result = "Dependency Graph:\n"
         for name, node in self.nodes.items():
             result += f"- {name}\n"
-            for dep in node.dependencies:
+            for dep in node.dependencies.values():
                 result += f"  └─ {dep.package.name}\n"
         return result
 
@@ -103,26 +169,31 @@ class DependencyGraphBuilder:
         if not os.path.exists(file_path):
             return requirements
             
-        with open(file_path, 'r') as file:
-            for line in file:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                    
-                # Handle egg fragments, URLs, etc.
-                if ' @ ' in line:
-                    pkg_name = line.split(' @ ')[0]
-                    # For simplicity, use 'latest' for URL dependencies
-                    requirements.append((pkg_name, 'latest'))
-                    continue
+        data = Path(file_path).read_bytes()
+        if data.startswith(codecs.BOM_UTF8):
+            data = data[len(codecs.BOM_UTF8):]
+        
+        for raw_line in data.splitlines():
+            # Skip blank lines and comments before decoding anything
+            raw_line = raw_line.strip()
+            if not raw_line or raw_line[:1] == b'#':
+                continue
+            line = raw_line.decode('utf-8')
+                
+            # Handle egg fragments, URLs, etc.
+            if ' @ ' in line:
+                pkg_name = line.split(' @ ')[0]
+                # For simplicity, use 'latest' for URL dependencies
+                requirements.append((pkg_name, 'latest'))
+                continue
+            
+            # Basic version specifier
+            match = _REQ_RE.match(line)
+            if match:
+                pkg_name = sys.intern(match.group(1).strip())
+                version = match.group(2).strip() or 'latest'
+                requirements.append((pkg_name, version))
                 
-                # Basic version specifier
-                match = re.match(r'^([^<>=!~]+)(?:[<>=!~]=?|$)(.*)$', line)
-                if match:
-                    pkg_name = match.group(1).strip()
-                    version = match.group(2).strip() or 'latest'
-                    requirements.append((pkg_name, version))
-                    
         return requirements
     
     @staticmethod
@@ -133,9 +204,8 @@ class DependencyGraphBuilder:
             return requirements
             
         try:
-            import toml
-            with open(file_path, 'r') as file:
-                pyproject = toml.load(file)
+            with open(file_path, 'rb') as file:
+                pyproject = tomllib.load(file)
                 
             # Poetry dependencies
             if 'tool' in pyproject and 'poetry' in pyproject['tool']:
@@ -152,14 +222,12 @@ class DependencyGraphBuilder:
                 for dep in pyproject['project']['dependencies']:
                     # Simple string dependency
                     if isinstance(dep, str):
-                        match = re.match(r'^([^<>=!~]+)(?:[<>=!~]=?|$)(.*)$', dep)
+                        match = _REQ_RE.match(dep)
                         if match:
-                            pkg_name = match.group(1).strip()
+                            pkg_name = sys.intern(match.group(1).strip())
                             version = match.group(2).strip() or 'latest'
                             requirements.append((pkg_name, version))
                     
-        except ImportError:
-            print("Warning: toml package not found. Unable to parse pyproject.toml.")
         except Exception as e:
             print(f"Error parsing pyproject.toml: {e}")
             
@@ -183,22 +251,23 @@ class DependencyGraphBuilder:
         pyproject_file = project_path / "pyproject.toml"
         
         # Create root package
-        root_package = PackageInfo(
-            name=project_path.name,
-            version="0.0.0"  # Default version for the project
+        root_package = _intern_package(
+            project_path.name,
+            "0.0.0"  # Default version for the project
         )
+        graph.root = root_package
         
         # Parse requirements
         for req_file in req_files:
             if req_file.exists():
                 for pkg_name, version in cls._parse_requirements_txt(str(req_file)):
-                    dep_package = PackageInfo(name=pkg_name, version=version)
+                    dep_package = _intern_package(pkg_name, version)
                     graph.add_dependency(root_package, dep_package)
         
         # Parse pyproject.toml
         if pyproject_file.exists():
             for pkg_name, version in cls._parse_pyproject_toml(str(pyproject_file)):
-                dep_package = PackageInfo(name=pkg_name, version=version)
+                dep_package = _intern_package(pkg_name, version)
                 graph.add_dependency(root_package, dep_package)
         
         # Build transitive dependencies
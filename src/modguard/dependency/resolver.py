@@ -1,19 +1,106 @@
 """
 Resolve package dependencies and their versions.
 """
+import atexit
+import json
 import os
-import re
+import shutil
 import subprocess
 import sys
 import tempfile
-from typing import Dict, List, Optional, Set, Tuple
+import threading
+import urllib.parse
+import urllib.request
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from packaging.requirements import InvalidRequirement, Requirement
+from packaging.specifiers import SpecifierSet
+from packaging.utils import canonicalize_name
+from packaging.version import InvalidVersion, Version
+
+try:
+    from resolvelib import AbstractProvider
+except ImportError:  # resolvelib is optional, see DependencyResolver._check_compatibility
+    AbstractProvider = object
 
 from modguard.models.conflict import PackageInfo
 
+_PYPI_JSON_URL = "https://pypi.org/pypi/{}/json"
+_PYPI_RELEASE_JSON_URL = "https://pypi.org/pypi/{}/{}/json"
+_PYPI_TIMEOUT = 10
+
+# Upper bound on resolver rounds for a single in-process compatibility check
+_MAX_RESOLUTION_ROUNDS = 200
+
+# Package name -> available versions (newest first)
+_VERSIONS_CACHE: Dict[str, List[str]] = {}
+
+# (package name, version) -> requirements that apply to this interpreter
+_REQUIRES_CACHE: Dict[Tuple[str, str], List[Requirement]] = {}
+
+# Packages that ship with a fresh venv and must never be uninstalled from it
+_VENV_BASE_PACKAGES = frozenset({"pip", "setuptools", "wheel"})
+
+
+def _fetch_pypi_json(url: str) -> Optional[Dict[str, Any]]:
+    """Fetch a PyPI JSON API document, or None if it cannot be retrieved."""
+    try:
+        with urllib.request.urlopen(url, timeout=_PYPI_TIMEOUT) as response:
+            return json.load(response)
+    except (OSError, ValueError):
+        return None
+
+
+class _Candidate(NamedTuple):
+    """A concrete release considered by the in-process resolver."""
+    name: str
+    version: Version
+
+
+class _PyPIProvider(AbstractProvider):
+    """
+    resolvelib provider backed by PyPI release lists and Requires-Dist metadata.
+    
+    Extras are ignored and environment markers are evaluated for the running
+    interpreter.
+    """
+    
+    def identify(self, requirement_or_candidate) -> str:
+        return canonicalize_name(requirement_or_candidate.name)
+    
+    def get_preference(self, identifier, resolutions, candidates, information, backtrack_causes=()):
+        return identifier
+    
+    def find_matches(self, identifier, requirements, incompatibilities) -> List[_Candidate]:
+        specifier = SpecifierSet()
+        for requirement in requirements[identifier]:
+            specifier &= requirement.specifier
+        rejected = {candidate.version for candidate in incompatibilities[identifier]}
+        
+        matches = []
+        for version_str in DependencyResolver.get_available_versions(identifier):
+            version = Version(version_str)
+            if version not in rejected and specifier.contains(version, prereleases=True):
+                matches.append(_Candidate(identifier, version))
+        return matches
+    
+    def is_satisfied_by(self, requirement, candidate) -> bool:
+        return (
+            canonicalize_name(requirement.name) == candidate.name
+            and requirement.specifier.contains(candidate.version, prereleases=True)
+        )
+    
+    def get_dependencies(self, candidate) -> List[Requirement]:
+        return DependencyResolver._get_requirements(candidate.name, str(candidate.version))
+
 
 class DependencyResolver:
     """Resolve package dependencies and compatible versions."""
     
+    # Lazily created (venv_dir, pip_path) shared by all resolver calls
+    _venv: Optional[Tuple[str, str]] = None
+    _venv_lock = threading.Lock()
+    
     @staticmethod
     def _create_temp_venv() -> Tuple[str, str]:
         """Create a temporary virtual environment for resolving dependencies."""
@@ -34,32 +121,124 @@ class DependencyResolver:
             
         return temp_dir, pip_path
     
+    @classmethod
+    def _get_venv(cls) -> Tuple[str, str]:
+        """
+        Get the shared resolver virtual environment, creating it on first use.
+        
+        The environment is removed when the interpreter exits.
+        """
+        with cls._venv_lock:
+            if cls._venv is None:
+                cls._venv = cls._create_temp_venv()
+                atexit.register(shutil.rmtree, cls._venv[0], True)
+            return cls._venv
+    
     @staticmethod
-    def _get_available_versions(pip_path: str, package_name: str) -> List[str]:
-        """Get available versions of a package."""
-        try:
-            output = subprocess.check_output(
-                [pip_path, "index", "versions", package_name],
-                stderr=subprocess.DEVNULL,
-                text=True
-            )
-            
-            # Parse output to extract versions
-            match = re.search(r"Available versions: (.+)", output)
-            if match:
-                versions_str = match.group(1)
-                return [v.strip() for v in versions_str.split(',')]
+    def get_available_versions(package_name: str) -> List[str]:
+        """
+        Get available versions of a package from the PyPI JSON API.
+        
+        Pre-releases, unparseable versions and fully yanked releases are
+        skipped. Results are cached per package for the lifetime of the process.
+        
+        Returns:
+            Version strings sorted from newest to oldest
+        """
+        if package_name in _VERSIONS_CACHE:
+            return list(_VERSIONS_CACHE[package_name])
+        
+        data = _fetch_pypi_json(_PYPI_JSON_URL.format(urllib.parse.quote(package_name)))
+        if data is None:
             return []
-        except subprocess.CalledProcessError:
+        
+        versions = []
+        for version_str, files in data.get("releases", {}).items():
+            if files and all(f.get("yanked", False) for f in files):
+                continue
+            try:
+                version = Version(version_str)
+            except InvalidVersion:
+                continue
+            if not version.is_prerelease:
+                versions.append((version, version_str))
+        
+        result = [version_str for _, version_str in sorted(versions, reverse=True)]
+        _VERSIONS_CACHE[package_name] = result
+        return list(result)
+    
+    @staticmethod
+    def _get_requirements(package_name: str, version: str) -> List[Requirement]:
+        """
+        Get the requirements of a release from its PyPI Requires-Dist metadata.
+        
+        Requirements gated behind extras or markers that do not match the
+        running interpreter are dropped. Results are cached per release.
+        """
+        key = (package_name, version)
+        if key in _REQUIRES_CACHE:
+            return _REQUIRES_CACHE[key]
+        
+        data = _fetch_pypi_json(_PYPI_RELEASE_JSON_URL.format(
+            urllib.parse.quote(package_name), urllib.parse.quote(version)
+        ))
+        if data is None:
             return []
+        
+        requirements = []
+        for line in data.get("info", {}).get("requires_dist") or []:
+            try:
+                requirement = Requirement(line)
+            except InvalidRequirement:
+                continue
+            if requirement.marker is None or requirement.marker.evaluate({"extra": ""}):
+                requirements.append(requirement)
+        
+        _REQUIRES_CACHE[key] = requirements
+        return requirements
     
     @staticmethod
-    def _check_compatibility(pip_path: str, package_specs: List[str]) -> bool:
-        """Check if a set of package specifications are compatible."""
+    def _to_spec(package: PackageInfo) -> str:
+        """Format a package as a requirement specifier."""
+        if package.version[:1] in ("<", ">", "=", "!", "~"):
+            return f"{package.name}{package.version}"
+        return f"{package.name}=={package.version}"
+    
+    @classmethod
+    def _check_compatibility(cls, package_specs: List[str]) -> bool:
+        """
+        Check if a set of package specifications are compatible.
+        
+        When resolvelib is installed the specs are resolved in-process against
+        PyPI metadata; otherwise pip performs a dry-run install in the shared
+        resolver venv.
+        """
+        try:
+            from resolvelib import BaseReporter, ResolutionError, Resolver
+        except ImportError:
+            return cls._check_compatibility_with_pip(package_specs)
+        
         try:
-            # Use pip to check if the given set of packages can be installed together
+            requirements = [Requirement(spec) for spec in package_specs]
+        except InvalidRequirement:
+            return False
+        
+        try:
+            Resolver(_PyPIProvider(), BaseReporter()).resolve(
+                requirements, max_rounds=_MAX_RESOLUTION_ROUNDS
+            )
+            return True
+        except ResolutionError:
+            return False
+    
+    @classmethod
+    def _check_compatibility_with_pip(cls, package_specs: List[str]) -> bool:
+        """Check if a set of package specifications are compatible using pip."""
+        _, pip_path = cls._get_venv()
+        try:
+            # Ask pip to resolve the set without touching the environment
             subprocess.check_call(
-                [pip_path, "download", "--no-deps"] + package_specs,
+                [pip_path, "install", "--dry-run", "--ignore-installed"] + package_specs,
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL
             )
@@ -67,6 +246,61 @@ class DependencyResolver:
         except subprocess.CalledProcessError:
             return False
             
+    @staticmethod
+    def _find_newest_compatible(versions: List[str], is_compatible: Callable[[str], bool]) -> Optional[str]:
+        """
+        Find the newest compatible version with as few checks as possible.
+        
+        Compatibility is assumed to be monotone (every version older than a
+        compatible one is compatible too, as with upper-bound conflicts), so
+        versions 0, 1, 3, 7, ... are probed until one is compatible and the
+        boundary is then bisected. If no probe succeeds, the remaining
+        versions are checked one by one in case the assumption does not hold.
+        
+        Args:
+            versions: Candidate versions sorted from newest to oldest
+            is_compatible: Predicate checking a single version
+            
+        Returns:
+            A version confirmed compatible, or None if there is none
+        """
+        checked: Set[int] = set()
+        
+        def check(index: int) -> bool:
+            checked.add(index)
+            return is_compatible(versions[index])
+        
+        # Exponential probing: lo is the last incompatible index seen
+        lo, hi, step = -1, None, 1
+        while lo + step <= len(versions) - 1:
+            probe = lo + step
+            if check(probe):
+                hi = probe
+                break
+            lo, step = probe, step * 2
+        
+        if hi is None:
+            # Probe the oldest version too before giving up on monotonicity
+            last = len(versions) - 1
+            if last > lo and check(last):
+                hi = last
+        
+        if hi is not None:
+            # Bisect between the last incompatible and first compatible probe
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if check(mid):
+                    hi = mid
+                else:
+                    lo = mid
+            return versions[hi]
+        
+        # Fall back to a linear scan of the versions that were never probed
+        for index, version in enumerate(versions):
+            if index not in checked and is_compatible(version):
+                return version
+        return None
+    
     @classmethod
     def find_compatible_versions(cls, packages: List[PackageInfo], package_to_update: str) -> Optional[str]:
         """
@@ -80,38 +314,28 @@ class DependencyResolver:
             A compatible version string, or None if no compatible version was found
         """
         try:
-            # Create temporary virtual environment
-            temp_dir, pip_path = cls._create_temp_venv()
+            # Get all available versions of the package
+            available_versions = cls.get_available_versions(package_to_update)
             
-            try:
-                # Get all available versions of the package
-                available_versions = cls._get_available_versions(pip_path, package_to_update)
-                
-                if not available_versions:
-                    return None
-                
-                # Create package specs for the current packages (excluding the one to update)
-                current_specs = [
-                    f"{p.name}=={p.version}" for p in packages 
-                    if p.name != package_to_update and p.version != "latest"
-                ]
-                
-                # Try each version, starting from the newest
-                for version in sorted(available_versions, reverse=True):
-                    # Skip the current version
-                    if any(p.name == package_to_update and p.version == version for p in packages):
-                        continue
-                        
-                    # Check if this version is compatible with other packages
-                    if cls._check_compatibility(pip_path, current_specs + [f"{package_to_update}=={version}"]):
-                        return version
-                        
+            if not available_versions:
                 return None
-            finally:
-                # Clean up
-                import shutil
-                shutil.rmtree(temp_dir, ignore_errors=True)
-                
+            
+            # Create package specs for the current packages (excluding the one to update)
+            current_specs = [
+                cls._to_spec(p) for p in packages 
+                if p.name != package_to_update and p.version != "latest"
+            ]
+            
+            # Skip the current version
+            current_versions = {p.version for p in packages if p.name == package_to_update}
+            candidates = [v for v in available_versions if v not in current_versions]
+            
+            # Check if a version is compatible with other packages
+            return cls._find_newest_compatible(
+                candidates,
+                lambda version: cls._check_compatibility(current_specs + [f"{package_to_update}=={version}"])
+            )
+            
         except Exception as e:
             print(f"Error finding compatible versions: {e}")
             return None
@@ -129,14 +353,13 @@ class DependencyResolver:
             List of dependencies as PackageInfo objects
         """
         try:
-            # Create temporary virtual environment
-            temp_dir, pip_path = cls._create_temp_venv()
+            _, pip_path = cls._get_venv()
             
             try:
-                # Install the package
+                # Install just the package; its metadata lists the requirements
                 package_spec = f"{package_name}" if version is None or version == "latest" else f"{package_name}=={version}"
                 subprocess.check_call(
-                    [pip_path, "install", package_spec],
+                    [pip_path, "install", "--no-deps", package_spec],
                     stdout=subprocess.DEVNULL,
                     stderr=subprocess.DEVNULL
                 )
@@ -184,9 +407,13 @@ class DependencyResolver:
                 
                 return dependencies
             finally:
-                # Clean up
-                import shutil
-                shutil.rmtree(temp_dir, ignore_errors=True)
+                # Leave the shared environment as we found it
+                if package_name.lower() not in _VENV_BASE_PACKAGES:
+                    subprocess.call(
+                        [pip_path, "uninstall", "-y", package_name],
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL
+                    )
                 
         except Exception as e:
             print(f"Error getting transitive dependencies: {e}")
@@ -1,12 +1,37 @@
 """
 Detect module namespace collisions in Python projects.
 """
+import ast
+import functools
 import os
 import re
-from pathlib import Path
-from typing import Dict, List, Set, Tuple
+import sys
+from typing import AbstractSet, Dict, FrozenSet, Iterator, List, Optional, Pattern, Set, Tuple
 
-from modguard.models.conflict import ConflictReport, DetailedConflictReport, ModuleInfo
+from modguard.models.conflict import ConflictReport, ConflictSeverity, DetailedConflictReport, ModuleInfo
+
+# Directories that never contain project sources worth scanning
+_SKIP_DIRS = frozenset({
+    '.git', '.hg', '.svn', '.venv', 'venv', '__pycache__', 'node_modules',
+    'build', 'dist', '.tox', '.nox', '.mypy_cache', '.pytest_cache', 'site-packages',
+})
+
+# Below this many files, process start-up costs more than scanning serially
+_PARALLEL_SCAN_THRESHOLD = 64
+
+
+@functools.lru_cache(maxsize=8)
+def _conflicting_names_pattern(conflicting_modules: FrozenSet[str]) -> Pattern[bytes]:
+    """
+    Compile a single pattern matching any conflicting module name as a whole word.
+    
+    Scanning file contents once with this pattern replaces a separate
+    substring search per module name.
+    """
+    # Longest names first so that a name is never shadowed by one of its prefixes
+    names = sorted(conflicting_modules, key=len, reverse=True)
+    alternation = b'|'.join(re.escape(name.encode('utf-8')) for name in names)
+    return re.compile(rb'\b(?:' + alternation + rb')\b')
 
 
 class CollisionDetector:
@@ -23,74 +48,144 @@ class CollisionDetector:
         Returns:
             A ConflictReport containing all detected collisions
         """
-        # Create a map of module names to ModuleInfo objects
-        module_map: Dict[str, List[ModuleInfo]] = {}
+        # Module name -> (package name, modules) for names seen in a single package so far
+        first_seen: Dict[str, Tuple[str, List[ModuleInfo]]] = {}
+        # Module name -> modules, once a second package provides the same name
+        collisions: Dict[str, List[ModuleInfo]] = {}
         
-        # Process all modules from all packages
+        # Process all modules from all packages in a single pass
         for package_name, modules in modules_by_package.items():
             for module in modules:
-                if module.name not in module_map:
-                    module_map[module.name] = []
-                module_map[module.name].append(module)
+                colliding = collisions.get(module.name)
+                if colliding is not None:
+                    colliding.append(module)
+                    continue
+                
+                seen = first_seen.get(module.name)
+                if seen is None:
+                    first_seen[module.name] = (module.package.name, [module])
+                elif seen[0] == module.package.name:
+                    seen[1].append(module)
+                else:
+                    # Collision: the same module name comes from a different package
+                    collisions[module.name] = seen[1] + [module]
         
         # Create conflict report
         report = ConflictReport()
-        
-        # Find collisions (modules with the same name from different packages)
-        for module_name, modules in module_map.items():
-            # Consider it a collision if modules with the same name come from different packages
-            packages = {module.package.name for module in modules}
-            if len(packages) > 1:
-                for module in modules:
-                    report.add_conflict(module_name, module)
+        for module_name, modules in collisions.items():
+            for module in modules:
+                report.add_conflict(module_name, module)
         
         return report
     
     @staticmethod
-    def _find_imports_in_file(file_path: str) -> Dict[str, List[str]]:
+    def _find_imports_in_file(file_path: str, conflicting_modules: Optional[AbstractSet[str]] = None) -> Dict[str, List[str]]:
         """
         Find import statements in a Python file.
         
+        Args:
+            file_path: Path to the Python file
+            conflicting_modules: If given, only imports of these top-level modules are recorded
+            
         Returns a dictionary mapping module names to lists of import statements.
         """
-        imports = {}
+        imports: Dict[str, List[str]] = {}
+        if conflicting_modules is not None and not conflicting_modules:
+            return imports
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
+            with open(file_path, 'rb') as f:
                 content = f.read()
+            
+            # Most files never mention a conflicting module; skip parsing those
+            if conflicting_modules is not None:
+                pattern = _conflicting_names_pattern(frozenset(conflicting_modules))
+                hits = {m.decode('utf-8') for m in pattern.findall(content)}
+                if not hits:
+                    return imports
+                conflicting_modules = hits
+            
+            tree = ast.parse(content, filename=file_path, type_comments=False)
+            
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Import):
+                    # Regular imports (import xxx, import xxx as y)
+                    for alias in node.names:
+                        top_module = sys.intern(alias.name.split('.', 1)[0])
+                        if conflicting_modules is not None and top_module not in conflicting_modules:
+                            continue
+                        imports.setdefault(top_module, []).append(f"import {alias.name}")
                 
-            # Regular imports (import xxx)
-            for match in re.finditer(r'import\s+([^;#\n]+)', content):
-                import_str = match.group(1).strip()
-                for module in import_str.split(','):
-                    module = module.strip()
+                elif isinstance(node, ast.ImportFrom):
+                    # Relative imports always refer to the project itself
+                    if node.level or not node.module:
+                        continue
                     
-                    # Handle "import x as y"
-                    if ' as ' in module:
-                        module = module.split(' as ')[0].strip()
+                    top_module = sys.intern(node.module.split('.', 1)[0])
+                    if conflicting_modules is not None and top_module not in conflicting_modules:
+                        continue
                     
-                    # Extract the top-level module
-                    top_module = module.split('.')[0]
-                    if top_module not in imports:
-                        imports[top_module] = []
-                    imports[top_module].append(f"import {module}")
-            
-            # From imports (from xxx import yyy)
-            for match in re.finditer(r'from\s+([^;#\n\s]+)\s+import\s+([^;#\n]+)', content):
-                module = match.group(1).strip()
-                imports_str = match.group(2).strip()
-                
-                # Extract the top-level module
-                top_module = module.split('.')[0]
-                if top_module not in imports:
-                    imports[top_module] = []
-                imports[top_module].append(f"from {module} import {imports_str}")
+                    # Only build the statement string for modules we actually record
+                    names = ", ".join(
+                        f"{a.name} as {a.asname}" if a.asname else a.name for a in node.names
+                    )
+                    imports.setdefault(top_module, []).append(f"from {node.module} import {names}")
                 
         except Exception as e:
             print(f"Error analyzing imports in {file_path}: {e}")
             
         return imports
     
+    @classmethod
+    def _iter_python_files(cls, path: str) -> Iterator[str]:
+        """
+        Yield the paths of Python files under a directory.
+        
+        Directories in _SKIP_DIRS are pruned without being entered, and
+        symlinked directories are not followed.
+        """
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in _SKIP_DIRS:
+                            yield from cls._iter_python_files(entry.path)
+                    elif entry.name.endswith('.py'):
+                        yield entry.path
+        except OSError as e:
+            print(f"Error scanning directory {path}: {e}")
+    
+    @classmethod
+    def _scan_files(cls, file_paths: List[str], conflicting_modules: FrozenSet[str]) -> Iterator[Tuple[str, Dict[str, List[str]]]]:
+        """
+        Find imports of conflicting modules in each file.
+        
+        Large projects are scanned in a process pool; small ones, or platforms
+        where a pool cannot be started, are scanned serially.
+        
+        Yields:
+            (file_path, imports) tuples in the order of file_paths
+        """
+        if len(file_paths) >= _PARALLEL_SCAN_THRESHOLD:
+            # Imported here: multiprocessing is slow to import and only large scans need it
+            from concurrent.futures import ProcessPoolExecutor
+            from concurrent.futures.process import BrokenProcessPool
+            
+            try:
+                with ProcessPoolExecutor() as executor:
+                    results = list(executor.map(
+                        _scan_one,
+                        [(file_path, conflicting_modules) for file_path in file_paths],
+                        chunksize=32
+                    ))
+                yield from results
+                return
+            except (OSError, BrokenProcessPool) as e:
+                print(f"Parallel import scan unavailable, scanning serially: {e}")
+        
+        for file_path in file_paths:
+            yield file_path, cls._find_imports_in_file(file_path, conflicting_modules)
+    
     @classmethod
     def analyze_project_imports(cls, project_path: str, conflict_report: ConflictReport) -> DetailedConflictReport:
         """
@@ -103,35 +198,31 @@ class CollisionDetector:
         Returns:
             A DetailedConflictReport with additional information about module usage
         """
-        detailed_report = DetailedConflictReport()
-        detailed_report.conflicts = conflict_report.conflicts.copy()
+        detailed_report = DetailedConflictReport(conflicts=conflict_report.conflicts.copy())
+        detailed_report.finalize()
+        
+        # Nothing to look for, so don't touch the file system at all
+        if not detailed_report.conflicts:
+            return detailed_report
         
         # Get all conflicting module names
-        conflicting_modules = set(conflict_report.conflicts.keys())
-        
-        # Find Python files in the project
-        project_files = []
-        for root, _, files in os.walk(project_path):
-            for file in files:
-                if file.endswith('.py'):
-                    project_files.append(os.path.join(root, file))
-        
-        # Analyze imports in each file
-        for file_path in project_files:
-            file_imports = cls._find_imports_in_file(file_path)
-            
-            # Check for conflicting modules
-            for module_name in conflicting_modules:
-                if module_name in file_imports:
-                    for import_stmt in file_imports[module_name]:
+        conflicting_modules = frozenset(detailed_report.conflicts.keys())
+        
+        # Analyze imports in each Python file in the project
+        project_files = list(cls._iter_python_files(project_path))
+        for file_path, file_imports in cls._scan_files(project_files, conflicting_modules):
+            # Record usage of conflicting modules
+            for module_name, import_stmts in file_imports.items():
+                if module_name in conflicting_modules:
+                    for import_stmt in import_stmts:
                         detailed_report.add_import_path(module_name, f"{file_path}: {import_stmt}")
                         
                         # Set severity based on heuristics
                         # For now, a simple heuristic: direct imports are higher severity
                         if import_stmt.startswith(f"import {module_name}") or import_stmt.startswith(f"from {module_name} import"):
-                            detailed_report.set_severity(module_name, "HIGH")
+                            detailed_report.set_severity(module_name, ConflictSeverity.HIGH)
                         else:
-                            detailed_report.set_severity(module_name, "MEDIUM")
+                            detailed_report.set_severity(module_name, ConflictSeverity.MEDIUM)
         
         return detailed_report
     
@@ -153,4 +244,10 @@ class CollisionDetector:
         # Analyze project imports to assess impact
         detailed_report = cls.analyze_project_imports(project_path, conflict_report)
         
-        return detailed_report
\ No newline at end of file
+        return detailed_report
+
+
+def _scan_one(args: Tuple[str, FrozenSet[str]]) -> Tuple[str, Dict[str, List[str]]]:
+    """Process pool worker: find imports of conflicting modules in one file."""
+    file_path, conflicting_modules = args
+    return file_path, CollisionDetector._find_imports_in_file(file_path, conflicting_modules)
@@ -1,13 +1,86 @@
 """
 Engine for generating and applying fixes for module namespace collisions.
 """
+import configparser
+import functools
+import json
 import os
 import re
-from typing import Dict, List, Optional, Set, Tuple
+from collections import Counter, deque
+from typing import Dict, List, Optional, Pattern, Set, Tuple
 
-from modguard.models.conflict import ConflictReport, DetailedConflictReport
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib
+
+from modguard.models.conflict import ConflictReport, ConflictSeverity, DetailedConflictReport
 from modguard.models.fix_plan import FixAction, FixPlan, FixResult, FixType, AppliedFix
 
+# Files that version constraint fixes are written to, in order of preference
+_VERSION_FILES = ('requirements.txt', 'pyproject.toml')
+
+# pyproject.toml dependency tables, in order of preference
+_TOML_DEPENDENCY_SECTIONS = ('[tool.poetry.dependencies]', '[project.dependencies]')
+
+
+# Sidecar file mapping shimmed module names to the modules they redirect to
+_SHIM_REDIRECTS_FILE = 'redirects.json'
+
+# Import hook installed by the generated shim package. A single finder serves
+# every redirect with one dict lookup, however many modules are shimmed.
+_SHIM_FINDER_SOURCE = f"""# Generated by ModGuard - DO NOT EDIT
+# This file implements an import hook to resolve namespace conflicts
+
+import importlib
+import json
+import os
+import sys
+from importlib.abc import Loader, MetaPathFinder
+from importlib.util import spec_from_loader
+
+with open(os.path.join(os.path.dirname(__file__), "{_SHIM_REDIRECTS_FILE}")) as _file:
+    _REDIRECTS = json.load(_file)
+
+
+class _ShimLoader(Loader):
+    def __init__(self, module):
+        self._module = module
+
+    def create_module(self, spec):
+        return self._module
+
+    def exec_module(self, module):
+        pass
+
+
+class ModGuardShimFinder(MetaPathFinder):
+    def find_spec(self, fullname, path, target=None):
+        # Only handle direct imports of the conflicting modules
+        redirect_name = _REDIRECTS.get(fullname)
+        if redirect_name is None:
+            return None
+        # Redirect to the renamed module
+        return spec_from_loader(fullname, _ShimLoader(importlib.import_module(redirect_name)))
+
+
+# Install the finder once, at the beginning of sys.meta_path
+if not any(type(finder).__name__ == "ModGuardShimFinder" for finder in sys.meta_path):
+    sys.meta_path.insert(0, ModGuardShimFinder())
+"""
+
+
+@functools.lru_cache(maxsize=256)
+def _requirement_pattern(package_name: str) -> Pattern[str]:
+    """Compile the pattern matching a pinned package in requirements.txt."""
+    return re.compile(re.escape(package_name) + r'(==|>=|<=|~=|>|<).*')
+
+
+@functools.lru_cache(maxsize=256)
+def _toml_dependency_pattern(package_name: str) -> Pattern[str]:
+    """Compile the pattern matching a package entry in a pyproject.toml table."""
+    return re.compile(re.escape(package_name) + r'\s*=\s*".*"')
+
 
 class FixEngine:
     """Engine for generating and applying fixes for module namespace collisions."""
@@ -21,8 +94,8 @@ class FixEngine:
         analysis based on the project structure, import patterns, etc.
         """
         # For now, prefer shims for medium/low severity conflicts
-        severity = report.severities.get(module_name, "MEDIUM")
-        return severity in ["MEDIUM", "LOW"]
+        severity = report.severities.get(module_name, ConflictSeverity.MEDIUM)
+        return severity in (ConflictSeverity.MEDIUM, ConflictSeverity.LOW)
     
     @staticmethod
     def _should_use_version_constraint(module_name: str, report: DetailedConflictReport) -> bool:
@@ -33,8 +106,8 @@ class FixEngine:
         compatibility, transitive dependencies, etc.
         """
         # For simplicity, suggest version constraints for high/critical severity conflicts
-        severity = report.severities.get(module_name, "MEDIUM")
-        return severity in ["CRITICAL", "HIGH"]
+        severity = report.severities.get(module_name, ConflictSeverity.MEDIUM)
+        return severity >= ConflictSeverity.HIGH
     
     @staticmethod
     def _get_preferred_packages(module_name: str, report: DetailedConflictReport) -> List[str]:
@@ -45,7 +118,7 @@ class FixEngine:
         maintenance status, etc.
         """
         # For now, a simple heuristic based on import frequency
-        package_counts = {}
+        package_counts = Counter()
         
         if module_name in report.import_paths:
             for import_path in report.import_paths[module_name]:
@@ -53,29 +126,29 @@ class FixEngine:
                     # Check if the package name appears in import statements
                     # (Very simplistic, would need more sophisticated analysis in reality)
                     if module_info.package.name in import_path:
-                        package_counts[module_info.package.name] = \
-                            package_counts.get(module_info.package.name, 0) + 1
+                        package_counts[module_info.package.name] += 1
         
         # Sort packages by frequency (most frequent first)
-        return sorted(package_counts.keys(), key=lambda pkg: package_counts.get(pkg, 0), reverse=True)
+        return [pkg for pkg, _ in package_counts.most_common()]
     
     @classmethod
-    def suggest_fixes(cls, report: DetailedConflictReport) -> FixPlan:
+    def suggest_fixes(cls, report: ConflictReport) -> FixPlan:
         """
         Generate a plan to fix module namespace collisions.
         
         Args:
-            report: A DetailedConflictReport containing conflicts to fix
+            report: A ConflictReport (ideally a DetailedConflictReport) containing conflicts to fix
             
         Returns:
             A FixPlan with suggested fixes
         """
         plan = FixPlan(conflict_report=report)
         
-        for module_name, modules in report.conflicts.items():
-            if len(modules) <= 1:
-                continue  # No conflict
-                
+        # Plain reports have no severities or import paths; treat them as all-default
+        if not isinstance(report, DetailedConflictReport):
+            report = DetailedConflictReport(conflicts=report.conflicts)
+        
+        for module_name, modules in report.iter_conflicts():
             if cls._should_use_shim(module_name, report):
                 # For each conflicting module except the preferred one, suggest a rename shim
                 preferred_packages = cls._get_preferred_packages(module_name, report)
@@ -130,98 +203,139 @@ class FixEngine:
         return plan
     
     @staticmethod
-    def _apply_shim_fix(action: FixAction, project_path: str) -> AppliedFix:
+    def _declared_package_names(project_path: str) -> List[str]:
+        """Get the project names declared in pyproject.toml and setup.cfg."""
+        names = []
+        
+        try:
+            with open(os.path.join(project_path, 'pyproject.toml'), 'rb') as f:
+                pyproject = tomllib.load(f)
+            names.append(pyproject.get('project', {}).get('name'))
+            names.append(pyproject.get('tool', {}).get('poetry', {}).get('name'))
+        except (OSError, tomllib.TOMLDecodeError, AttributeError):
+            pass
+        
+        setup_cfg = configparser.ConfigParser()
+        try:
+            setup_cfg.read(os.path.join(project_path, 'setup.cfg'))
+            names.append(setup_cfg.get('metadata', 'name', fallback=None))
+        except configparser.Error:
+            pass
+        
+        # Distribution names map to import names with underscores
+        return list(dict.fromkeys(
+            name.replace('-', '_').replace('.', '_') for name in names if isinstance(name, str) and name
+        ))
+    
+    @classmethod
+    def _find_project_init(cls, project_path: str) -> Optional[str]:
+        """
+        Find the project __init__.py that should import the shims.
+        
+        The package named in the project metadata is tried first, at the
+        project root or in a src/ layout. Otherwise directories are searched
+        breadth first, so the shallowest package (usually the main one) wins
+        and the search stops at the first match. The .modguard directory and
+        symlinked directories are skipped.
+        
+        Returns:
+            Path to the __init__.py, or None if the project has none
+        """
+        for name in cls._declared_package_names(project_path):
+            for package_dir in (os.path.join(project_path, name), os.path.join(project_path, 'src', name)):
+                init_path = os.path.join(package_dir, '__init__.py')
+                # A failed open doubles as the existence check
+                try:
+                    with open(init_path, 'rb'):
+                        return init_path
+                except OSError:
+                    continue
+        
+        directories = deque([project_path])
+        while directories:
+            directory = directories.popleft()
+            subdirectories = []
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.name == '__init__.py' and entry.is_file():
+                            return entry.path
+                        if entry.name != '.modguard' and entry.is_dir(follow_symlinks=False):
+                            subdirectories.append(entry.path)
+            except OSError:
+                continue
+            # Keep a deterministic order independent of the filesystem
+            directories.extend(sorted(subdirectories))
+        return None
+    
+    @classmethod
+    def _apply_shim_fix(cls, action: FixAction, project_path: str, init_path: Optional[str] = None) -> AppliedFix:
         """
         Apply a rename shim fix by adding an import hook.
         
         In a real implementation, we'd generate proper import hook code
         and modify project files to include it.
+        
+        Args:
+            action: The RENAME_SHIM action to apply
+            project_path: Path to the project directory
+            init_path: The project __init__.py to import the shims from, as
+                found by _find_project_init ("" if there is none). Looked up
+                when not given.
         """
-        # Create a Python file for the import hook
+        # The shim package holds one import hook for all redirected modules
         shim_dir = os.path.join(project_path, '.modguard', 'shims')
         os.makedirs(shim_dir, exist_ok=True)
         
-        shim_file = os.path.join(shim_dir, f"shim_{action.package_name}_{action.module_name}.py")
-        
-        content = f"""
-# Generated by ModGuard - DO NOT EDIT
-# This file implements an import hook to resolve namespace conflicts
-
-import sys
-from importlib.abc import MetaPathFinder, Loader
-from importlib.util import spec_from_loader, module_from_spec
-import importlib.machinery
-
-class {action.package_name.capitalize()}{action.module_name.capitalize()}ShimFinder(MetaPathFinder):
-    def find_spec(self, fullname, path, target=None):
-        # Only handle direct imports of the conflicting module
-        if fullname == "{action.module_name}":
-            # Redirect to the renamed module
-            return self._create_spec("{action.details['renamed_to']}")
-        return None
-        
-    def _create_spec(self, redirect_name):
-        # Load the actual module
-        actual_module = importlib.import_module(redirect_name)
-        
-        # Create a loader that returns the actual module
-        class ShimLoader(Loader):
-            def create_module(self, spec):
-                return actual_module
-                
-            def exec_module(self, module):
-                pass
-        
-        # Create and return the spec
-        return spec_from_loader("{action.module_name}", ShimLoader())
-
-# Install the finder at the beginning of sys.meta_path
-sys.meta_path.insert(0, {action.package_name.capitalize()}{action.module_name.capitalize()}ShimFinder())
-"""
+        redirects_file = os.path.join(shim_dir, _SHIM_REDIRECTS_FILE)
+        init_file = os.path.join(shim_dir, "__init__.py")
         
         try:
-            with open(shim_file, 'w') as f:
-                f.write(content)
-                
-            # Also create/update the __init__.py file to import all shims
-            init_file = os.path.join(shim_dir, "__init__.py")
-            new_import = f"from .shim_{action.package_name}_{action.module_name} import *"
-            
+            content = None
             if os.path.exists(init_file):
                 with open(init_file, 'r') as f:
                     content = f.read()
-                    
-                if new_import not in content:
-                    with open(init_file, 'a') as f:
-                        f.write(f"\n{new_import}\n")
-            else:
+            
+            # Shim packages from before redirects.json import one module per
+            # redirect; replacing their __init__.py would silently drop those
+            if content is not None and content != _SHIM_FINDER_SOURCE and not os.path.exists(redirects_file):
+                return AppliedFix(
+                    action=action,
+                    success=False,
+                    details=f"Failed to create import hook: {shim_dir} was created by an older version "
+                            f"of ModGuard; remove it and apply the fixes again"
+                )
+            
+            # Register the redirect next to any existing ones
+            redirects = {}
+            if os.path.exists(redirects_file):
+                with open(redirects_file, 'r') as f:
+                    redirects = json.load(f)
+            redirects[action.module_name] = action.details['renamed_to']
+            with open(redirects_file, 'w') as f:
+                json.dump(redirects, f, indent=2, sort_keys=True)
+                
+            # Create (or replace an outdated) shim package __init__.py
+            if content != _SHIM_FINDER_SOURCE:
                 with open(init_file, 'w') as f:
-                    f.write(f"# Generated by ModGuard - DO NOT EDIT\n{new_import}\n")
+                    f.write(_SHIM_FINDER_SOURCE)
             
             # Update project's main __init__.py to import the shims
-            for root, dirs, files in os.walk(project_path):
-                # Skip the .modguard directory itself
-                if '.modguard' in root:
-                    continue
+            if init_path is None:
+                init_path = cls._find_project_init(project_path)
+            if init_path:
+                # Read and append through a single handle
+                with open(init_path, 'r+') as f:
+                    content = f.read()
                     
-                # Look for a suitable __init__.py to modify
-                if '__init__.py' in files:
-                    init_path = os.path.join(root, '__init__.py')
-                    with open(init_path, 'r') as f:
-                        content = f.read()
-                        
                     import_line = "import modguard.shims  # Namespace conflict resolution"
                     if import_line not in content:
-                        with open(init_path, 'a') as f:
-                            f.write(f"\n# Added by ModGuard to resolve namespace conflicts\n{import_line}\n")
-                            
-                    # Only update one __init__.py file (preferably the main one)
-                    break
+                        f.write(f"\n# Added by ModGuard to resolve namespace conflicts\n{import_line}\n")
             
             return AppliedFix(
                 action=action,
                 success=True,
-                details=f"Created import hook at {shim_file}"
+                details=f"Registered import hook for {action.module_name} in {redirects_file}"
             )
         except Exception as e:
             return AppliedFix(
@@ -231,84 +345,135 @@ sys.meta_path.insert(0, {action.package_name.capitalize()}{action.module_name.ca
             )
     
     @staticmethod
-    def _apply_version_constraint_fix(action: FixAction, project_path: str) -> AppliedFix:
+    def _update_requirements_txt(content: str, action: FixAction) -> str:
+        """Pin the action's package to its new version in requirements.txt content."""
+        updated = _requirement_pattern(action.package_name).sub(
+            f'{action.package_name}=={action.details["new_version"]}',
+            content
+        )
+        
+        # If the package wasn't found, add it
+        if action.package_name not in updated:
+            updated += f'\n{action.package_name}=={action.details["new_version"]}\n'
+        
+        return updated
+    
+    @staticmethod
+    def _update_pyproject_toml(content: str, action: FixAction) -> Optional[str]:
         """
-        Apply a version constraint fix by updating requirements.txt or pyproject.toml.
+        Pin the action's package to its new version in pyproject.toml content.
         
-        In a real implementation, we'd use more sophisticated version resolution.
+        Returns None if the content has no dependency section to update.
         """
-        files_to_check = [
-            os.path.join(project_path, 'requirements.txt'),
-            os.path.join(project_path, 'pyproject.toml')
-        ]
+        # Simple handling for pyproject.toml
+        # A real implementation would use a TOML parser
         
-        for file_path in files_to_check:
-            if not os.path.exists(file_path):
-                continue
-                
+        # Poetry style first, then PEP 621 style
+        section = next((s for s in _TOML_DEPENDENCY_SECTIONS if s in content), None)
+        if section is None:
+            # Can't find dependency section
+            return None
+            
+        # Simple string replacement (not robust, but illustrative)
+        pattern = _toml_dependency_pattern(action.package_name)
+        replacement = f'{action.package_name} = "{action.details["new_version"]}"'
+        
+        # Check if package exists in dependencies
+        if pattern.search(content):
+            return pattern.sub(replacement, content)
+        
+        # Add after the section header
+        section_pos = content.find(section) + len(section)
+        return content[:section_pos] + f'\n{replacement}' + content[section_pos:]
+    
+    @classmethod
+    def _apply_version_constraint_fixes_batched(cls, actions: List[FixAction],
+                                                project_path: str) -> List[AppliedFix]:
+        """
+        Apply version constraint fixes by updating requirements.txt or pyproject.toml.
+        
+        Each file is read and written at most once, however many actions
+        touch it. Every action updates the first file that can take it, just
+        as applying the actions one at a time would.
+        
+        Args:
+            actions: VERSION_CONSTRAINT fix actions
+            project_path: Path to the project directory
+            
+        Returns:
+            One AppliedFix per action, in the same order
+        """
+        if not actions:
+            return []
+        
+        # Read every candidate file up front; opening directly saves a stat per file
+        contents: Dict[str, str] = {}
+        read_errors: Dict[str, Exception] = {}
+        file_paths = []
+        for file_name in _VERSION_FILES:
+            file_path = os.path.join(project_path, file_name)
             try:
                 with open(file_path, 'r') as f:
-                    content = f.read()
-                
-                if file_path.endswith('.txt'):
-                    # Handle requirements.txt
-                    updated = re.sub(
-                        rf'{action.package_name}(==|>=|<=|~=|>|<).*',
-                        f'{action.package_name}=={action.details["new_version"]}',
-                        content
-                    )
-                    
-                    # If the package wasn't found, add it
-                    if action.package_name not in updated:
-                        updated += f'\n{action.package_name}=={action.details["new_version"]}\n'
-                        
-                elif file_path.endswith('.toml'):
-                    # Simple handling for pyproject.toml
-                    # A real implementation would use a TOML parser
-                    if '[tool.poetry.dependencies]' in content:
-                        # Poetry style
-                        section = '[tool.poetry.dependencies]'
-                    elif '[project.dependencies]' in content:
-                        # PEP 621 style
-                        section = '[project.dependencies]'
-                    else:
-                        # Can't find dependency section
-                        continue
-                        
-                    # Simple string replacement (not robust, but illustrative)
-                    pattern = rf'{action.package_name}\s*=\s*".*"'
-                    replacement = f'{action.package_name} = "{action.details["new_version"]}"'
-                    
-                    # Check if package exists in dependencies
-                    if re.search(pattern, content):
-                        updated = re.sub(pattern, replacement, content)
+                    contents[file_path] = f.read()
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                read_errors[file_path] = e
+            file_paths.append(file_path)
+        
+        # Apply all updates in memory; each outcome is (file path, error details)
+        outcomes: List[Tuple[Optional[str], Optional[str]]] = []
+        dirty: Set[str] = set()
+        for action in actions:
+            outcome = (None, "No requirements.txt or pyproject.toml found")
+            for file_path in file_paths:
+                if file_path in read_errors:
+                    outcome = (file_path, f"Failed to update version constraint: {str(read_errors[file_path])}")
+                    break
+                try:
+                    if file_path.endswith('.txt'):
+                        updated = cls._update_requirements_txt(contents[file_path], action)
                     else:
-                        # Add after the section header
-                        section_pos = content.find(section) + len(section)
-                        updated = content[:section_pos] + f'\n{action.package_name} = "{action.details["new_version"]}"' + content[section_pos:]
-                
-                # Write updated content back
+                        updated = cls._update_pyproject_toml(contents[file_path], action)
+                        if updated is None:
+                            continue
+                except Exception as e:
+                    outcome = (file_path, f"Failed to update version constraint: {str(e)}")
+                    break
+                contents[file_path] = updated
+                dirty.add(file_path)
+                outcome = (file_path, None)
+                break
+            outcomes.append(outcome)
+        
+        # Write each updated file back once
+        write_errors: Dict[str, Exception] = {}
+        for file_path in dirty:
+            try:
                 with open(file_path, 'w') as f:
-                    f.write(updated)
-                    
-                return AppliedFix(
-                    action=action,
-                    success=True,
-                    details=f"Updated version constraint in {file_path}"
-                )
-                
+                    f.write(contents[file_path])
             except Exception as e:
-                return AppliedFix(
-                    action=action,
-                    success=False,
-                    details=f"Failed to update version constraint: {str(e)}"
-                )
+                write_errors[file_path] = e
         
-        return AppliedFix(
-            action=action,
-            success=False,
-            details="No requirements.txt or pyproject.toml found"
-        )
+        applied = []
+        for action, (file_path, error) in zip(actions, outcomes):
+            if error is None and file_path in write_errors:
+                error = f"Failed to update version constraint: {str(write_errors[file_path])}"
+            applied.append(AppliedFix(
+                action=action,
+                success=error is None,
+                details=error or f"Updated version constraint in {file_path}"
+            ))
+        return applied
+    
+    @classmethod
+    def _apply_version_constraint_fix(cls, action: FixAction, project_path: str) -> AppliedFix:
+        """
+        Apply a version constraint fix by updating requirements.txt or pyproject.toml.
+        
+        In a real implementation, we'd use more sophisticated version resolution.
+        """
+        return cls._apply_version_constraint_fixes_batched([action], project_path)[0]
     
     @classmethod
     def apply_fixes(cls, plan: FixPlan, project_path: str, dry_run: bool = False) -> FixResult:
@@ -325,6 +490,18 @@ sys.meta_path.insert(0, {action.package_name.capitalize()}{action.module_name.ca
         """
         result = FixResult(plan=plan)
         
+        # Version constraint fixes are applied together so each file is rewritten once
+        version_fixes = iter([])
+        # Every shim is imported from the same __init__.py, so only look for it once
+        init_path = None
+        if not dry_run:
+            if any(action.fix_type == FixType.RENAME_SHIM for action in plan.actions):
+                init_path = cls._find_project_init(project_path) or ""
+            version_fixes = iter(cls._apply_version_constraint_fixes_batched(
+                [action for action in plan.actions if action.fix_type == FixType.VERSION_CONSTRAINT],
+                project_path
+            ))
+        
         for action in plan.actions:
             if dry_run:
                 # In dry run mode, just simulate success
@@ -336,9 +513,9 @@ sys.meta_path.insert(0, {action.package_name.capitalize()}{action.module_name.ca
             else:
                 # Apply the fix based on its type
                 if action.fix_type == FixType.RENAME_SHIM:
-                    applied = cls._apply_shim_fix(action, project_path)
+                    applied = cls._apply_shim_fix(action, project_path, init_path)
                 elif action.fix_type == FixType.VERSION_CONSTRAINT:
-                    applied = cls._apply_version_constraint_fix(action, project_path)
+                    applied = next(version_fixes)
                 else:
                     applied = AppliedFix(
                         action=action,
@@ -1,10 +1,11 @@
 """
 Version resolver for fixing module conflicts by suggesting alternative package versions.
 """
-import re
-import subprocess
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple
 
+from modguard.dependency.resolver import DependencyResolver
 from modguard.models.conflict import ConflictReport, ModuleInfo, PackageInfo
 from modguard.models.fix_plan import FixAction, FixPlan, FixType
 
@@ -17,7 +18,7 @@ class VersionResolver:
     @staticmethod
     def _get_available_versions(package_name: str, count: int = 5) -> List[str]:
         """
-        Get available versions for a package from PyPI.
+        Get available versions for a package from the PyPI JSON API.
         
         Args:
             package_name: The name of the package.
@@ -26,46 +27,8 @@ class VersionResolver:
         Returns:
             A list of version strings.
         """
-        try:
-            # Use pip to get available versions
-            result = subprocess.check_output(
-                ["pip", "index", "versions", package_name],
-                text=True,
-                stderr=subprocess.PIPE
-            )
-            
-            # Extract versions from output
-            versions = []
-            for line in result.splitlines():
-                match = re.search(r'Available versions: (.+)', line)
-                if match:
-                    version_str = match.group(1)
-                    versions = [v.strip() for v in version_str.split(',')]
-                    break
-            
-            # Return the most recent versions
-            return versions[:count]
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            # Try alternative approach (PyPI JSON API would be better but requires additional dependencies)
-            try:
-                result = subprocess.check_output(
-                    ["pip", "install", f"{package_name}==", "--quiet"],
-                    text=True,
-                    stderr=subprocess.PIPE
-                )
-                
-                # Extract versions from error message
-                versions = []
-                for line in result.splitlines():
-                    match = re.search(r'from versions: (.+)', line)
-                    if match:
-                        version_str = match.group(1)
-                        versions = [v.strip() for v in version_str.split(',')]
-                        break
-                
-                return versions[:count]
-            except subprocess.CalledProcessError:
-                return []
+        # Newest first, served from the resolver's per-process cache
+        return DependencyResolver.get_available_versions(package_name)[:count]
     
     @staticmethod
     def _compare_modules(version1_modules: List[ModuleInfo], version2_modules: List[ModuleInfo]) -> Dict[str, bool]:
@@ -79,14 +42,8 @@ class VersionResolver:
         Returns:
             Dictionary mapping module names to booleans indicating if they're in version 2.
         """
-        v1_module_names = {m.name for m in version1_modules}
-        v2_module_names = {m.name for m in version2_modules}
-        
-        result = {}
-        for name in v1_module_names:
-            result[name] = name in v2_module_names
-        
-        return result
+        v2 = {m.name for m in version2_modules}
+        return {m.name: m.name in v2 for m in version1_modules}
     
     @classmethod
     def suggest_version_fixes(cls, conflict_report: ConflictReport) -> FixPlan:
@@ -101,26 +58,35 @@ class VersionResolver:
         """
         fix_plan = FixPlan(conflict_report=conflict_report)
         
-        # Process each conflicting module
-        for module_name, conflicting_modules in conflict_report.conflicts.items():
-            if len(conflicting_modules) <= 1:
-                continue  # No conflict
-            
+        # Group each conflicting module's entries by package
+        grouped: List[Tuple[str, Dict[str, List[ModuleInfo]]]] = []
+        for module_name, conflicting_modules in conflict_report.iter_conflicts():
             # Group by packages
-            modules_by_package = {}
+            modules_by_package: Dict[str, List[ModuleInfo]] = defaultdict(list)
             for module in conflicting_modules:
-                if module.package.name not in modules_by_package:
-                    modules_by_package[module.package.name] = []
                 modules_by_package[module.package.name].append(module)
             
             # Only process if we have actual conflicts across packages
             if len(modules_by_package) <= 1:
                 continue
             
+            grouped.append((module_name, modules_by_package))
+        
+        # Look up every package's versions once, with the network requests in parallel
+        package_names = list({name for _, modules_by_package in grouped for name in modules_by_package})
+        available_versions: Dict[str, List[str]] = {}
+        if package_names:
+            with ThreadPoolExecutor(max_workers=min(8, len(package_names))) as executor:
+                available_versions = dict(zip(
+                    package_names, executor.map(cls._get_available_versions, package_names)
+                ))
+        
+        # Process each conflicting module
+        for module_name, modules_by_package in grouped:
             # For each package involved in the conflict
             for package_name, modules in modules_by_package.items():
                 # Get alternative versions
-                alt_versions = cls._get_available_versions(package_name)
+                alt_versions = available_versions[package_name]
                 
                 # Skip if we couldn't get alternative versions
                 if not alt_versions:
@@ -147,4 +113,4 @@ class VersionResolver:
                 
                 fix_plan.add_action(action)
         
-        return fix_plan
\ No newline at end of file
+        return fix_plan
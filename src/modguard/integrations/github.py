@@ -1,17 +1,41 @@
 """
 GitHub Actions integration for ModGuard.
 """
-import json
 import os
-from typing import List, Optional
+import sys
+from contextlib import contextmanager
+from typing import Iterator, Optional, TextIO, Union
 
-from modguard.models.conflict import ConflictReport, ConflictSeverity
+from modguard.models.conflict import ConflictReport, ConflictSeverity, DetailedConflictReport
 from modguard.models.fix_plan import FixPlan
 
+# GitHub annotation type, indexed by ConflictSeverity value (INFO .. CRITICAL)
+_ANNOTATION_TYPES = ("notice", "notice", "warning", "error", "error")
+
+
+# Workflow command formatters, one per combination of location parameters
+def _format_plain(type_: str, message: str) -> str:
+    return f"::{type_}::{message}"
+
+
+def _format_file(type_: str, message: str, file: str) -> str:
+    return f"::{type_} file={file}::{message}"
+
+
+def _format_file_line(type_: str, message: str, file: str, line: int) -> str:
+    return f"::{type_} file={file},line={line}::{message}"
+
+
+def _format_file_line_col(type_: str, message: str, file: str, line: int, col: int) -> str:
+    return f"::{type_} file={file},line={line},col={col}::{message}"
+
 
 class GitHubActionReporter:
     """Reporter for GitHub Actions workflow."""
     
+    # Open GITHUB_OUTPUT file while inside output_batch()
+    _output_fp: Optional[TextIO] = None
+    
     @staticmethod
     def is_github_actions() -> bool:
         """Check if running in GitHub Actions environment."""
@@ -35,109 +59,130 @@ class GitHubActionReporter:
         Returns:
             A formatted GitHub Actions workflow command.
         """
-        params = []
-        
-        if file:
-            params.append(f"file={file}")
-            
-            if line:
-                params.append(f"line={line}")
-                
-                if col:
-                    params.append(f"col={col}")
-        
-        param_str = ",".join(params)
-        if param_str:
-            param_str = " " + param_str
-        
-        return f"::{type_}{param_str}::{message}"
+        if not file:
+            return _format_plain(type_, message)
+        if not line:
+            return _format_file(type_, message, file)
+        if not col:
+            return _format_file_line(type_, message, file, line)
+        return _format_file_line_col(type_, message, file, line, col)
     
     @staticmethod
-    def severity_to_annotation_type(severity: str) -> str:
+    def severity_to_annotation_type(severity: Union[ConflictSeverity, str]) -> str:
         """
         Convert a ConflictSeverity to GitHub annotation type.
         
         Args:
-            severity: A ConflictSeverity value.
+            severity: A ConflictSeverity, or the name of one.
             
         Returns:
             A GitHub annotation type ('error', 'warning', or 'notice').
         """
-        severity_map = {
-            ConflictSeverity.CRITICAL: "error",
-            ConflictSeverity.HIGH: "error",
-            ConflictSeverity.MEDIUM: "warning",
-            ConflictSeverity.LOW: "notice",
-            ConflictSeverity.INFO: "notice",
-        }
-        return severity_map.get(severity, "warning")
+        if not isinstance(severity, ConflictSeverity):
+            severity = ConflictSeverity.__members__.get(severity)
+            if severity is None:
+                return "warning"
+        return _ANNOTATION_TYPES[severity]
     
     @classmethod
-    def report_conflicts(cls, report: ConflictReport) -> List[str]:
+    def report_conflicts(cls, report: ConflictReport) -> Iterator[str]:
         """
         Generate GitHub Actions annotations for conflicts.
         
         Args:
             report: The conflict report to annotate.
             
-        Returns:
-            A list of GitHub Actions workflow commands.
+        Yields:
+            GitHub Actions workflow commands, one per annotation (none outside GitHub Actions).
         """
-        annotations = []
+        # Annotations only mean something to the Actions runner
+        if not cls.is_github_actions():
+            return
         
-        # Check if we have a detailed report with severities
-        has_severities = hasattr(report, "severities") and hasattr(report, "import_paths")
+        # Only detailed reports carry severities and import paths
+        severities = {}
+        detailed = isinstance(report, DetailedConflictReport)
+        if detailed:
+            severities = report.severities
         
-        for module_name, modules in report.conflicts.items():
-            if len(modules) <= 1:
-                continue  # No conflict
-            
+        for module_name, modules in report.iter_conflicts():
             # Get severity (if available)
-            severity = ConflictSeverity.MEDIUM
-            if has_severities:
-                severity = getattr(report, "severities", {}).get(module_name, ConflictSeverity.MEDIUM)
+            severity = severities.get(module_name, ConflictSeverity.MEDIUM)
             
             # Convert to annotation type
             annotation_type = cls.severity_to_annotation_type(severity)
             
             # Build message
-            packages = [f"{m.package.name} ({m.package.version})" for m in modules]
+            packages = [m.package.label for m in modules]
             message = f"Module '{module_name}' has namespace conflicts between packages: {', '.join(packages)}"
             
             # Add annotation for each file where the module is imported (if available)
-            if has_severities and module_name in getattr(report, "import_paths", {}):
-                for import_path in getattr(report, "import_paths", {}).get(module_name, []):
-                    # For simplicity, we're not parsing line/column numbers
-                    annotations.append(cls.get_annotation_command(
-                        annotation_type, message, file=import_path
-                    ))
+            import_paths = report.get_import_paths(module_name) if detailed else ()
+            if import_paths:
+                # For simplicity, we're not parsing line/column numbers
+                for import_path in import_paths:
+                    yield _format_file(annotation_type, message, import_path)
             else:
                 # Add a general annotation
-                annotations.append(cls.get_annotation_command(annotation_type, message))
+                yield _format_plain(annotation_type, message)
+    
+    @classmethod
+    def write_annotations(cls, report: ConflictReport, stream: Optional[TextIO] = None) -> None:
+        """
+        Write GitHub Actions annotations for conflicts in a single write.
+        
+        Args:
+            report: The conflict report to annotate.
+            stream: Where to write the workflow commands (defaults to stdout).
+        """
+        text = "".join(annotation + "\n" for annotation in cls.report_conflicts(report))
+        if not text:
+            return
         
-        return annotations
+        if stream is None:
+            stream = sys.stdout
+        stream.write(text)
+        stream.flush()
     
     @classmethod
-    def report_fix_plan(cls, fix_plan: FixPlan) -> List[str]:
+    def report_fix_plan(cls, fix_plan: FixPlan) -> Iterator[str]:
         """
         Generate GitHub Actions annotations for fix suggestions.
         
         Args:
             fix_plan: The fix plan to annotate.
             
-        Returns:
-            A list of GitHub Actions workflow commands.
+        Yields:
+            GitHub Actions workflow commands, one per fix action (none outside GitHub Actions).
         """
-        annotations = []
+        if not cls.is_github_actions():
+            return
         
         for action in fix_plan.actions:
-            # Build message
-            message = f"Suggested fix: {action}"
-            
             # Add as notice
-            annotations.append(cls.get_annotation_command("notice", message))
+            yield _format_plain("notice", f"Suggested fix: {action}")
+    
+    @classmethod
+    @contextmanager
+    def output_batch(cls) -> Iterator[None]:
+        """
+        Keep the GitHub Actions output file open for several set_output calls.
+        
+        Outputs set inside the block are appended through a single file handle
+        instead of reopening the file for each one.
+        """
+        output_file = os.environ.get("GITHUB_OUTPUT")
+        if cls._output_fp is not None or not output_file or not cls.is_github_actions():
+            # Already batching, or set_output won't write to a file
+            yield
+            return
         
-        return annotations
+        with open(output_file, "a") as f:
+            cls._output_fp = f
+            try:
+                yield
+            finally:
+                cls._output_fp = None
     
     @classmethod
     def set_output(cls, name: str, value) -> None:
@@ -151,10 +196,14 @@ class GitHubActionReporter:
         if cls.is_github_actions():
             # Handle complex objects
             if not isinstance(value, str):
+                # Imported here to keep json off the import path of the hooks
+                import json
                 value = json.dumps(value)
             
             output_file = os.environ.get("GITHUB_OUTPUT")
-            if output_file:
+            if cls._output_fp is not None:
+                cls._output_fp.write(f"{name}<<EOF\n{value}\nEOF\n")
+            elif output_file:
                 with open(output_file, "a") as f:
                     f.write(f"{name}<<EOF\n{value}\nEOF\n")
             else:
@@ -2,7 +2,6 @@
 Pre-commit hook integration for ModGuard.
 """
 import os
-import sys
 from typing import Dict, List, Optional, Tuple
 
 from modguard.models.conflict import ConflictReport
@@ -66,17 +65,12 @@ repos:
         if not report.has_conflicts():
             return "No module conflicts detected.", 0
         
-        output = []
-        output.append(f"ModGuard detected {report.get_conflict_count()} module conflicts:")
-        output.append("")
-        
-        for module_name, modules in report.conflicts.items():
-            if len(modules) <= 1:
-                continue  # No conflict
-                
-            packages = [f"{m.package.name} ({m.package.version})" for m in modules]
-            output.append(f"- Module '{module_name}' conflicts between: {', '.join(packages)}")
-        
+        output = [f"ModGuard detected {report.get_conflict_count()} module conflicts:", ""]
+        output.extend([
+            f"- Module '{module_name}' conflicts between: "
+            + ", ".join([m.package.label for m in modules])
+            for module_name, modules in report.iter_conflicts()
+        ])
         output.append("")
         output.append("Run 'modguard scan . --fix' to apply automatic fixes.")
         
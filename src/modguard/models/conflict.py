@@ -1,27 +1,60 @@
 """
 Models for representing module conflicts in Python projects.
 """
+import sys
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Set, Tuple
+from enum import IntEnum
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
 
 
-@dataclass
-class PackageInfo:
-    """Information about a Python package."""
+class _FrozenSlots:
+    """Pickle and copy support for frozen dataclasses that declare __slots__."""
+    __slots__ = ()
+    
+    def __getstate__(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+    
+    def __setstate__(self, state: tuple) -> None:
+        # Frozen dataclasses reject normal attribute assignment
+        for name, value in zip(self.__slots__, state):
+            object.__setattr__(self, name, value)
+
+
+@dataclass(frozen=True)
+class PackageInfo(_FrozenSlots):
+    """Information about a Python package (immutable and hashable)."""
+    # No per-instance __dict__; a scan creates very many of these
+    __slots__ = ("name", "version", "_label")
+    
     name: str
     version: str
     
+    def __post_init__(self) -> None:
+        # Names are compared and hashed constantly; interning makes equal names identical
+        object.__setattr__(self, "name", sys.intern(self.name))
+        object.__setattr__(self, "_label", f"{self.name} ({self.version})")
+    
+    @property
+    def label(self) -> str:
+        """The package as shown in conflict reports, e.g. 'requests (2.31.0)'."""
+        return self._label
+    
     def __str__(self) -> str:
         return f"{self.name}=={self.version}"
 
 
-@dataclass
-class ModuleInfo:
-    """Information about a Python module."""
+@dataclass(frozen=True)
+class ModuleInfo(_FrozenSlots):
+    """Information about a Python module (immutable and hashable)."""
+    __slots__ = ("name", "path", "package")
+    
     name: str
     path: str
     package: PackageInfo
     
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "name", sys.intern(self.name))
+    
     def __str__(self) -> str:
         return f"{self.name} (from {self.package})"
 
@@ -31,74 +64,118 @@ class ConflictReport:
     """Report of module namespace conflicts."""
     # Module name -> List of conflicting modules
     conflicts: Dict[str, List[ModuleInfo]] = field(default_factory=dict)
+    # Names of modules with more than one entry, in the order they became conflicts
+    _conflict_keys: Dict[str, None] = field(default_factory=dict, init=False, repr=False, compare=False)
+    # Module name -> quoted, comma-separated package names, dropped when a module is added
+    _packages_cache: Dict[str, str] = field(default_factory=dict, init=False, repr=False, compare=False)
+    
+    def __post_init__(self) -> None:
+        self._conflict_keys = dict.fromkeys(
+            module_name for module_name, modules in self.conflicts.items() if len(modules) > 1
+        )
     
     def add_conflict(self, module_name: str, module_info: ModuleInfo) -> None:
         """Add a module to the conflict report."""
-        if module_name not in self.conflicts:
-            self.conflicts[module_name] = []
-        self.conflicts[module_name].append(module_info)
+        modules = self.conflicts.setdefault(module_name, [])
+        modules.append(module_info)
+        self._packages_cache.pop(module_name, None)
+        if len(modules) == 2:
+            self._conflict_keys[module_name] = None
+    
+    def finalize(self) -> None:
+        """Drop modules provided by a single package once the report is fully populated."""
+        self.conflicts = {module_name: self.conflicts[module_name] for module_name in self._conflict_keys}
     
     def has_conflicts(self) -> bool:
         """Check if there are any conflicts."""
-        return any(len(modules) > 1 for modules in self.conflicts.values())
+        return bool(self._conflict_keys)
     
     def get_conflict_count(self) -> int:
         """Get the number of conflicts."""
-        return sum(1 for modules in self.conflicts.values() if len(modules) > 1)
+        return len(self._conflict_keys)
+    
+    def iter_conflicts(self) -> Iterator[Tuple[str, List[ModuleInfo]]]:
+        """Iterate over (module name, modules) for actual conflicts only."""
+        for module_name in self._conflict_keys:
+            yield module_name, self.conflicts[module_name]
+    
+    def _packages_for(self, module_name: str) -> str:
+        """Get the names of the packages providing a module, quoted and comma-separated."""
+        packages = self._packages_cache.get(module_name)
+        if packages is None:
+            packages = ", ".join(["'" + m.package.name + "'" for m in self.conflicts[module_name]])
+            self._packages_cache[module_name] = packages
+        return packages
     
     def __str__(self) -> str:
         if not self.has_conflicts():
             return "No module conflicts detected."
         
-        result = f"Detected {self.get_conflict_count()} module conflicts:\n"
-        for module_name, modules in self.conflicts.items():
-            if len(modules) > 1:
-                result += f"- Module '{module_name}' conflicts between packages: "
-                result += ", ".join(f"'{m.package.name}'" for m in modules)
-                result += "\n"
-        return result
+        lines = [f"Detected {self.get_conflict_count()} module conflicts:"]
+        for module_name in self._conflict_keys:
+            packages = self._packages_for(module_name)
+            lines.append(f"- Module '{module_name}' conflicts between packages: {packages}")
+        lines.append("")
+        return "\n".join(lines)
 
 
-@dataclass
-class ConflictSeverity:
-    """Severity levels for conflicts."""
-    CRITICAL = "CRITICAL"  # Will certainly cause errors
-    HIGH = "HIGH"          # Likely to cause errors
-    MEDIUM = "MEDIUM"      # May cause errors in some cases
-    LOW = "LOW"            # Unlikely to cause errors
-    INFO = "INFO"          # Just informational
+class ConflictSeverity(IntEnum):
+    """Severity levels for conflicts, ordered from least to most severe."""
+    INFO = 0      # Just informational
+    LOW = 1       # Unlikely to cause errors
+    MEDIUM = 2    # May cause errors in some cases
+    HIGH = 3      # Likely to cause errors
+    CRITICAL = 4  # Will certainly cause errors
+    
+    def __str__(self) -> str:
+        return self.name
+    
+    def __format__(self, format_spec: str) -> str:
+        # Render as the name in reports rather than the integer value
+        return format(self.name, format_spec)
 
 
 @dataclass
 class DetailedConflictReport(ConflictReport):
     """Extended conflict report with severity and analysis."""
-    severities: Dict[str, str] = field(default_factory=dict)
+    severities: Dict[str, ConflictSeverity] = field(default_factory=dict)
     import_paths: Dict[str, Set[str]] = field(default_factory=dict)
+    # Module name -> sorted snapshot of its import paths, dropped when a path is added
+    _sorted_paths_cache: Dict[str, Tuple[str, ...]] = field(default_factory=dict, init=False, repr=False,
+                                                            compare=False)
     
-    def set_severity(self, module_name: str, severity: str) -> None:
-        """Set the severity level for a conflicting module."""
+    def set_severity(self, module_name: str, severity: Union[ConflictSeverity, str]) -> None:
+        """Set the severity level for a conflicting module (a ConflictSeverity or its name)."""
+        if not isinstance(severity, ConflictSeverity):
+            severity = ConflictSeverity[severity]
         self.severities[module_name] = severity
     
     def add_import_path(self, module_name: str, import_path: str) -> None:
         """Add an import path where the module is being used."""
-        if module_name not in self.import_paths:
-            self.import_paths[module_name] = set()
-        self.import_paths[module_name].add(import_path)
+        self.import_paths.setdefault(module_name, set()).add(import_path)
+        self._sorted_paths_cache.pop(module_name, None)
+    
+    def get_import_paths(self, module_name: str) -> Tuple[str, ...]:
+        """Get the import paths where the module is being used, in sorted order."""
+        paths = self._sorted_paths_cache.get(module_name)
+        if paths is None:
+            paths = tuple(sorted(self.import_paths.get(module_name, ())))
+            self._sorted_paths_cache[module_name] = paths
+        return paths
     
     def __str__(self) -> str:
         if not self.has_conflicts():
             return "No module conflicts detected."
         
-        result = f"Detected {self.get_conflict_count()} module conflicts:\n"
-        for module_name, modules in self.conflicts.items():
-            if len(modules) > 1:
-                severity = self.severities.get(module_name, ConflictSeverity.MEDIUM)
-                result += f"- [{severity}] Module '{module_name}' conflicts between packages: "
-                result += ", ".join(f"'{m.package.name}'" for m in modules)
-                
-                if module_name in self.import_paths:
-                    result += "\n  Used in:"
-                    for path in self.import_paths[module_name]:
-                        result += f"\n  - {path}"
-                result += "\n"
-        return result
\ No newline at end of file
+        lines = [f"Detected {self.get_conflict_count()} module conflicts:"]
+        for module_name in self._conflict_keys:
+            severity = self.severities.get(module_name, ConflictSeverity.MEDIUM)
+            packages = self._packages_for(module_name)
+            lines.append(f"- [{severity}] Module '{module_name}' conflicts between packages: {packages}")
+            
+            paths = self.get_import_paths(module_name)
+            if paths:
+                lines.append("  Used in:")
+                lines.extend(["  - " + path for path in paths])
+        lines.append("")
+        return "\n".join(lines)
\ No newline at end of file
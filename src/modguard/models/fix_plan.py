@@ -23,8 +23,15 @@ class FixAction:
     module_name: str
     package_name: str
     details: Dict[str, str] = field(default_factory=dict)
+    # Rendered description, computed on first str(); actions are not changed after creation
+    _rendered: Optional[str] = field(default=None, init=False, repr=False, compare=False)
     
     def __str__(self) -> str:
+        if self._rendered is None:
+            self._rendered = self._render()
+        return self._rendered
+    
+    def _render(self) -> str:
         if self.fix_type == FixType.RENAME_SHIM:
             renamed_to = self.details.get("renamed_to", f"{self.package_name}.{self.module_name}")
             return f"Rename '{self.module_name}' in '{self.package_name}' to '{renamed_to}'"
@@ -43,18 +50,30 @@ class FixPlan:
     """A plan to fix module conflicts."""
     conflict_report: ConflictReport
     actions: List[FixAction] = field(default_factory=list)
+    # Module name / package name -> actions, in plan order
+    _by_module: Dict[str, List[FixAction]] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _by_package: Dict[str, List[FixAction]] = field(default_factory=dict, init=False, repr=False, compare=False)
+    
+    def __post_init__(self) -> None:
+        for action in self.actions:
+            self._index_action(action)
+    
+    def _index_action(self, action: FixAction) -> None:
+        self._by_module.setdefault(action.module_name, []).append(action)
+        self._by_package.setdefault(action.package_name, []).append(action)
     
     def add_action(self, action: FixAction) -> None:
         """Add a fix action to the plan."""
         self.actions.append(action)
+        self._index_action(action)
     
     def get_actions_for_module(self, module_name: str) -> List[FixAction]:
         """Get all fix actions for a specific module."""
-        return [action for action in self.actions if action.module_name == module_name]
+        return list(self._by_module.get(module_name, ()))
     
     def get_actions_for_package(self, package_name: str) -> List[FixAction]:
         """Get all fix actions for a specific package."""
-        return [action for action in self.actions if action.package_name == package_name]
+        return list(self._by_package.get(package_name, ()))
     
     def has_actions(self) -> bool:
         """Check if there are any fix actions in the plan."""
@@ -64,10 +83,10 @@ class FixPlan:
         if not self.has_actions():
             return "No fixes required."
         
-        result = f"Fix plan for {self.conflict_report.get_conflict_count()} conflicts:\n"
-        for action in self.actions:
-            result += f"- {action}\n"
-        return result
+        lines = [f"Fix plan for {self.conflict_report.get_conflict_count()} conflicts:"]
+        lines.extend([f"- {action}" for action in self.actions])
+        lines.append("")
+        return "\n".join(lines)
 
 
 @dataclass
@@ -87,28 +106,39 @@ class FixResult:
     """The result of applying a fix plan."""
     plan: FixPlan
     applied_fixes: List[AppliedFix] = field(default_factory=list)
+    # Running totals, kept up to date by add_result
+    _success_count: int = field(default=0, init=False, repr=False, compare=False)
+    _failure_count: int = field(default=0, init=False, repr=False, compare=False)
+    
+    def __post_init__(self) -> None:
+        self._success_count = sum(1 for fix in self.applied_fixes if fix.success)
+        self._failure_count = len(self.applied_fixes) - self._success_count
     
     def add_result(self, fix: AppliedFix) -> None:
         """Add a fix result."""
         self.applied_fixes.append(fix)
+        if fix.success:
+            self._success_count += 1
+        else:
+            self._failure_count += 1
     
     def all_successful(self) -> bool:
         """Check if all fixes were applied successfully."""
-        return all(fix.success for fix in self.applied_fixes)
+        return self._failure_count == 0
     
     def success_count(self) -> int:
         """Get the number of successfully applied fixes."""
-        return sum(1 for fix in self.applied_fixes if fix.success)
+        return self._success_count
     
     def failure_count(self) -> int:
         """Get the number of failed fixes."""
-        return sum(1 for fix in self.applied_fixes if not fix.success)
+        return self._failure_count
     
     def __str__(self) -> str:
         if not self.applied_fixes:
             return "No fixes were applied."
         
-        result = f"Applied {self.success_count()}/{len(self.applied_fixes)} fixes:\n"
-        for fix in self.applied_fixes:
-            result += f"- {fix}\n"
-        return result
\ No newline at end of file
+        lines = [f"Applied {self.success_count()}/{len(self.applied_fixes)} fixes:"]
+        lines.extend([f"- {fix}" for fix in self.applied_fixes])
+        lines.append("")
+        return "\n".join(lines)
\ No newline at end of file
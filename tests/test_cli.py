@@ -1,7 +1,6 @@
 """
 Tests for the CLI interface.
 """
-import os
 import tempfile
 from pathlib import Path
 from unittest import mock
@@ -158,12 +157,10 @@ def test_scan_command_with_config_file():
             strategy = "rename_shim"
             """)
         
-        with mock.patch("modguard.cli.scan_project") as mock_scan:
-            mock_scan.return_value = ConflictReport()
-            
-            # Change to the temp directory and run the command
-            with mock.patch("os.getcwd", return_value=temp_dir):
-                main(["scan", "."])
+        # Run the command from the temp directory
+        with mock.patch("modguard.cli.scan_project", return_value=ConflictReport()) as mock_scan, \
+                mock.patch("os.getcwd", return_value=temp_dir):
+            main(["scan", "."])
             
             # Check that config was loaded
             mock_scan.assert_called_once()
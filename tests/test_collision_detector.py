@@ -2,147 +2,274 @@
 Tests for the collision detector.
 """
 import os
-import unittest
-from unittest.mock import MagicMock, patch
+import re
+from unittest.mock import MagicMock, mock_open, patch
 
-from modguard.detector.collision_detector import CollisionDetector
-from modguard.models.conflict import ConflictReport, DetailedConflictReport, ModuleInfo, PackageInfo
+import pytest
 
+from modguard.detector.collision_detector import (
+    _PARALLEL_SCAN_THRESHOLD, CollisionDetector, _conflicting_names_pattern
+)
+from modguard.models.conflict import ConflictReport, DetailedConflictReport, ModuleInfo, PackageInfo
 
-class TestCollisionDetector(unittest.TestCase):
-    """Test the CollisionDetector class."""
-
-    def setUp(self):
-        """Set up test data."""
-        # Create package info objects
-        self.pkg_a = PackageInfo(name="package-a", version="1.0.0")
-        self.pkg_b = PackageInfo(name="package-b", version="2.0.0")
-        self.pkg_c = PackageInfo(name="package-c", version="3.0.0")
-        
-        # Create module info objects
-        self.module_a1 = ModuleInfo(name="utils", path="/path/to/package-a/utils.py", package=self.pkg_a)
-        self.module_a2 = ModuleInfo(name="core", path="/path/to/package-a/core.py", package=self.pkg_a)
-        self.module_b1 = ModuleInfo(name="utils", path="/path/to/package-b/utils.py", package=self.pkg_b)
-        self.module_b2 = ModuleInfo(name="helpers", path="/path/to/package-b/helpers.py", package=self.pkg_b)
-        self.module_c1 = ModuleInfo(name="core", path="/path/to/package-c/core.py", package=self.pkg_c)
-        
-        # Create modules by package dictionary
-        self.modules_by_package = {
-            "package-a": [self.module_a1, self.module_a2],
-            "package-b": [self.module_b1, self.module_b2],
-            "package-c": [self.module_c1]
-        }
-
-    def test_detect_collisions(self):
-        """Test detecting module namespace collisions."""
-        # Detect collisions
-        report = CollisionDetector.detect_collisions(self.modules_by_package)
-        
-        # Verify the report
-        self.assertTrue(report.has_conflicts())
-        self.assertEqual(report.get_conflict_count(), 2)
-        
-        # Check that the correct modules are identified as conflicts
-        self.assertIn("utils", report.conflicts)
-        self.assertIn("core", report.conflicts)
-        
-        # Check that each conflict has the correct modules
-        utils_conflict = report.conflicts["utils"]
-        self.assertEqual(len(utils_conflict), 2)
-        self.assertIn(self.module_a1, utils_conflict)
-        self.assertIn(self.module_b1, utils_conflict)
-        
-        core_conflict = report.conflicts["core"]
-        self.assertEqual(len(core_conflict), 2)
-        self.assertIn(self.module_a2, core_conflict)
-        self.assertIn(self.module_c1, core_conflict)
-    
-    def test_no_collisions(self):
-        """Test detecting no collisions."""
-        # Create modules by package dictionary with no collisions
-        modules_by_package = {
-            "package-a": [
-                ModuleInfo(name="utils_a", path="/path/to/package-a/utils_a.py", package=self.pkg_a),
-                ModuleInfo(name="core_a", path="/path/to/package-a/core_a.py", package=self.pkg_a)
-            ],
-            "package-b": [
-                ModuleInfo(name="utils_b", path="/path/to/package-b/utils_b.py", package=self.pkg_b),
-                ModuleInfo(name="helpers", path="/path/to/package-b/helpers.py", package=self.pkg_b)
-            ]
-        }
-        
-        # Detect collisions
-        report = CollisionDetector.detect_collisions(modules_by_package)
-        
-        # Verify the report
-        self.assertFalse(report.has_conflicts())
-        self.assertEqual(report.get_conflict_count(), 0)
-    
-    @patch('builtins.open', new_callable=unittest.mock.mock_open, read_data="""
+# Source files read by the _find_imports_in_file tests
+IMPORT_SNIPPET = """
 import os
 import sys
 import utils
 from core import function
 from package.module import Class
 import another.module as am
-    """)
-    def test_find_imports_in_file(self, mock_open):
-        """Test finding import statements in a Python file."""
-        # Find imports
-        imports = CollisionDetector._find_imports_in_file("test_file.py")
-        
-        # Verify the imports
-        self.assertEqual(len(imports), 5)
-        self.assertIn("os", imports)
-        self.assertIn("sys", imports)
-        self.assertIn("utils", imports)
-        self.assertIn("core", imports)
-        self.assertIn("package", imports)
-        
-        # Check that each import has the correct statements
-        self.assertEqual(imports["os"], ["import os"])
-        self.assertEqual(imports["sys"], ["import sys"])
-        self.assertEqual(imports["utils"], ["import utils"])
-        self.assertEqual(imports["core"], ["from core import function"])
-        self.assertEqual(imports["package"], ["from package.module import Class"])
-    
-    @patch.object(CollisionDetector, '_find_imports_in_file')
-    @patch('os.walk')
-    def test_analyze_project_imports(self, mock_walk, mock_find_imports):
-        """Test analyzing imports in a project."""
-        # Mock os.walk to return some Python files
-        mock_walk.return_value = [
-            ("/path/to/project", ["subdir"], ["file1.py", "file2.py"]),
-            ("/path/to/project/subdir", [], ["file3.py"])
-        ]
-        
-        # Mock _find_imports_in_file to return some imports
-        mock_find_imports.side_effect = [
-            {"utils": ["import utils"], "os": ["import os"]},
-            {"core": ["from core import function"]},
-            {"utils": ["from utils import helper"]}
+    """
+
+# Top-level module -> import statements found in IMPORT_SNIPPET
+EXPECTED_IMPORTS = {
+    "os": ["import os"],
+    "sys": ["import sys"],
+    "utils": ["import utils"],
+    "core": ["from core import function"],
+    "package": ["from package.module import Class"],
+    "another": ["import another.module"],
+}
+
+FILTERED_IMPORT_SNIPPET = b"""
+\"\"\"Docstring mentioning import utils should be ignored.\"\"\"
+import os
+import utils
+from core import function
+from . import sibling
+
+def helper():
+    from utils.sub import thing as t
+    """
+
+
+@pytest.fixture(scope="module")
+def pkg_a():
+    """First package providing colliding modules."""
+    return PackageInfo(name="package-a", version="1.0.0")
+
+
+@pytest.fixture(scope="module")
+def pkg_b():
+    """Second package providing colliding modules."""
+    return PackageInfo(name="package-b", version="2.0.0")
+
+
+@pytest.fixture(scope="module")
+def modules(pkg_a, pkg_b):
+    """Modules of three packages, shared by all tests (the model objects are immutable)."""
+    pkg_c = PackageInfo(name="package-c", version="3.0.0")
+    return {
+        "a1": ModuleInfo(name="utils", path="/path/to/package-a/utils.py", package=pkg_a),
+        "a2": ModuleInfo(name="core", path="/path/to/package-a/core.py", package=pkg_a),
+        "b1": ModuleInfo(name="utils", path="/path/to/package-b/utils.py", package=pkg_b),
+        "b2": ModuleInfo(name="helpers", path="/path/to/package-b/helpers.py", package=pkg_b),
+        "c1": ModuleInfo(name="core", path="/path/to/package-c/core.py", package=pkg_c),
+    }
+
+
+@pytest.fixture(scope="module")
+def modules_by_package(modules):
+    """Modules grouped by providing package, as the extractor returns them."""
+    return {
+        "package-a": [modules["a1"], modules["a2"]],
+        "package-b": [modules["b1"], modules["b2"]],
+        "package-c": [modules["c1"]]
+    }
+
+
+@pytest.fixture(scope="module")
+def conflict_report(modules):
+    """Report of the 'utils' and 'core' conflicts (analyze_project_imports only reads it)."""
+    report = ConflictReport()
+    report.add_conflict("utils", modules["a1"])
+    report.add_conflict("utils", modules["b1"])
+    report.add_conflict("core", modules["a2"])
+    report.add_conflict("core", modules["c1"])
+    return report
+
+
+def test_detect_collisions(modules, modules_by_package):
+    """Test detecting module namespace collisions."""
+    # Detect collisions
+    report = CollisionDetector.detect_collisions(modules_by_package)
+    
+    # Verify the report
+    assert report.has_conflicts()
+    assert report.get_conflict_count() == 2
+    
+    # Check that the correct modules are identified as conflicts
+    assert "utils" in report.conflicts
+    assert "core" in report.conflicts
+    
+    # Check that each conflict has the correct modules
+    utils_conflict = report.conflicts["utils"]
+    assert len(utils_conflict) == 2
+    assert modules["a1"] in utils_conflict
+    assert modules["b1"] in utils_conflict
+    
+    core_conflict = report.conflicts["core"]
+    assert len(core_conflict) == 2
+    assert modules["a2"] in core_conflict
+    assert modules["c1"] in core_conflict
+
+
+def test_no_collisions(pkg_a, pkg_b):
+    """Test detecting no collisions."""
+    # Create modules by package dictionary with no collisions
+    modules_by_package = {
+        "package-a": [
+            ModuleInfo(name="utils_a", path="/path/to/package-a/utils_a.py", package=pkg_a),
+            ModuleInfo(name="core_a", path="/path/to/package-a/core_a.py", package=pkg_a)
+        ],
+        "package-b": [
+            ModuleInfo(name="utils_b", path="/path/to/package-b/utils_b.py", package=pkg_b),
+            ModuleInfo(name="helpers", path="/path/to/package-b/helpers.py", package=pkg_b)
         ]
-        
-        # Create a conflict report
-        report = ConflictReport()
-        report.add_conflict("utils", self.module_a1)
-        report.add_conflict("utils", self.module_b1)
-        report.add_conflict("core", self.module_a2)
-        report.add_conflict("core", self.module_c1)
-        
-        # Analyze project imports
-        detailed_report = CollisionDetector.analyze_project_imports("/path/to/project", report)
-        
-        # Verify the detailed report
-        self.assertTrue(isinstance(detailed_report, DetailedConflictReport))
-        self.assertEqual(detailed_report.get_conflict_count(), 2)
-        
-        # Check that the import paths are correct
-        self.assertIn("utils", detailed_report.import_paths)
-        self.assertIn("core", detailed_report.import_paths)
-        self.assertEqual(len(detailed_report.import_paths["utils"]), 2)
-        self.assertEqual(len(detailed_report.import_paths["core"]), 1)
-
-
-if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    }
+    
+    # Detect collisions
+    report = CollisionDetector.detect_collisions(modules_by_package)
+    
+    # Verify the report
+    assert not report.has_conflicts()
+    assert report.get_conflict_count() == 0
+
+
+def test_detect_collisions_keeps_all_modules(pkg_a, modules):
+    """Test that every module sharing a colliding name is reported."""
+    module_a3 = ModuleInfo(name="utils", path="/path/to/package-a/sub/utils.py", package=pkg_a)
+    modules_by_package = {
+        "package-a": [modules["a1"], module_a3],
+        "package-b": [modules["b1"]],
+    }
+    
+    report = CollisionDetector.detect_collisions(modules_by_package)
+    
+    assert report.get_conflict_count() == 1
+    assert report.conflicts["utils"] == [modules["a1"], module_a3, modules["b1"]]
+
+
+def test_find_imports_in_file():
+    """Test finding import statements in a Python file."""
+    # Find imports
+    with patch('builtins.open', mock_open(read_data=IMPORT_SNIPPET)):
+        imports = CollisionDetector._find_imports_in_file("test_file.py")
+    
+    # Verify the imports
+    assert imports == EXPECTED_IMPORTS
+
+
+def test_find_imports_in_file_filtered():
+    """Test that only conflicting modules are recorded."""
+    with patch('builtins.open', mock_open(read_data=FILTERED_IMPORT_SNIPPET)):
+        imports = CollisionDetector._find_imports_in_file("test_file.py", {"utils", "sibling"})
+    
+    assert set(imports) == {"utils"}
+    assert imports["utils"] == ["import utils", "from utils.sub import thing as t"]
+
+
+def test_find_imports_in_file_compiles_prefilter_once():
+    """Test that the name prefilter is compiled once per set of conflicting modules."""
+    pattern = _conflicting_names_pattern(frozenset({"utils", "core"}))
+    
+    assert isinstance(pattern, re.Pattern)
+    assert _conflicting_names_pattern(frozenset({"core", "utils"})) is pattern
+    
+    # Filtering through the prefilter gives the same imports as the full parse
+    with patch('builtins.open', mock_open(read_data=IMPORT_SNIPPET.encode())), \
+            patch('modguard.detector.collision_detector.re.compile', wraps=re.compile) as mock_compile:
+        imports = CollisionDetector._find_imports_in_file("test_file.py", {"utils", "core"})
+    
+    assert imports == {name: EXPECTED_IMPORTS[name] for name in ("utils", "core")}
+    mock_compile.assert_not_called()
+
+
+@pytest.mark.parametrize("content", [
+    b"import os\nimport sys\n",
+    # Names merely containing a conflicting module must not match
+    b"import myutils\nimport utils_extra\n",
+])
+def test_find_imports_in_file_skips_unrelated_files(content):
+    """Test that files not mentioning a conflicting module are not parsed."""
+    with patch('builtins.open', mock_open(read_data=content)), \
+            patch('modguard.detector.collision_detector.ast.parse') as mock_parse:
+        imports = CollisionDetector._find_imports_in_file("test_file.py", {"utils"})
+    
+    assert imports == {}
+    mock_parse.assert_not_called()
+
+
+def test_analyze_project_imports(conflict_report, monkeypatch):
+    """Test analyzing imports in a project."""
+    # Mock the file walk to return some Python files
+    monkeypatch.setattr(CollisionDetector, "_iter_python_files", MagicMock(return_value=[
+        "/path/to/project/file1.py",
+        "/path/to/project/file2.py",
+        "/path/to/project/subdir/file3.py"
+    ]))
+    
+    # Mock _find_imports_in_file to return some imports
+    monkeypatch.setattr(CollisionDetector, "_find_imports_in_file", MagicMock(side_effect=[
+        {"utils": ["import utils"], "os": ["import os"]},
+        {"core": ["from core import function"]},
+        {"utils": ["from utils import helper"]}
+    ]))
+    
+    # Analyze project imports
+    detailed_report = CollisionDetector.analyze_project_imports("/path/to/project", conflict_report)
+    
+    # Verify the detailed report
+    assert isinstance(detailed_report, DetailedConflictReport)
+    assert detailed_report.get_conflict_count() == 2
+    
+    # Check that the import paths are correct
+    assert "utils" in detailed_report.import_paths
+    assert "core" in detailed_report.import_paths
+    assert len(detailed_report.import_paths["utils"]) == 2
+    assert len(detailed_report.import_paths["core"]) == 1
+
+
+def test_analyze_project_imports_without_conflicts(monkeypatch):
+    """Test that the project is not scanned when there are no conflicts."""
+    mock_iter_files = MagicMock()
+    monkeypatch.setattr(CollisionDetector, "_iter_python_files", mock_iter_files)
+    
+    detailed_report = CollisionDetector.analyze_project_imports("/path/to/project", ConflictReport())
+    
+    assert not detailed_report.has_conflicts()
+    mock_iter_files.assert_not_called()
+
+
+def test_iter_python_files_skips_excluded_dirs(tmp_path):
+    """Test that virtualenv and build directories are not scanned."""
+    for rel_path in ["main.py", "pkg/mod.py", "pkg/data.txt", ".venv/lib/dep.py",
+                     "build/lib/copy.py", "pkg/__pycache__/mod.py"]:
+        path = tmp_path / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+    
+    files = sorted(os.path.relpath(p, tmp_path) for p in CollisionDetector._iter_python_files(str(tmp_path)))
+    
+    assert files == ["main.py", os.path.join("pkg", "mod.py")]
+
+
+@pytest.mark.slow
+def test_scan_files_in_process_pool(tmp_path, monkeypatch):
+    """Test that a large project scanned in a process pool matches a serial scan."""
+    file_paths = []
+    for i in range(_PARALLEL_SCAN_THRESHOLD):
+        path = tmp_path / f"mod{i}.py"
+        path.write_text("import utils\n" if i % 2 else "from core import function\n")
+        file_paths.append(str(path))
+    conflicting_modules = frozenset({"utils", "core"})
+    
+    parallel = list(CollisionDetector._scan_files(file_paths, conflicting_modules))
+    
+    # Below the threshold the same files are scanned serially
+    monkeypatch.setattr("modguard.detector.collision_detector._PARALLEL_SCAN_THRESHOLD", len(file_paths) + 1)
+    serial = list(CollisionDetector._scan_files(file_paths, conflicting_modules))
+    
+    assert parallel == serial
+    assert parallel[1] == (file_paths[1], {"utils": ["import utils"]})
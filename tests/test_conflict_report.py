@@ -0,0 +1,131 @@
+"""
+Tests for the conflict report models.
+"""
+import copy
+import pickle
+
+import pytest
+
+from modguard.models.conflict import (
+    ConflictReport, ConflictSeverity, DetailedConflictReport, ModuleInfo, PackageInfo
+)
+
+
+def _module(module_name, package_name):
+    return ModuleInfo(name=module_name, path=f"/{package_name}/{module_name}.py",
+                      package=PackageInfo(name=package_name, version="1.0.0"))
+
+
+def test_conflicts_tracked_incrementally():
+    """Test that only modules provided more than once count as conflicts."""
+    report = ConflictReport()
+    report.add_conflict("utils", _module("utils", "package-a"))
+    report.add_conflict("core", _module("core", "package-a"))
+    assert not report.has_conflicts()
+    assert report.get_conflict_count() == 0
+
+    report.add_conflict("core", _module("core", "package-b"))
+    report.add_conflict("utils", _module("utils", "package-b"))
+    report.add_conflict("utils", _module("utils", "package-c"))
+
+    assert report.has_conflicts()
+    assert report.get_conflict_count() == 2
+    # In the order the modules became conflicts
+    assert [(name, len(modules)) for name, modules in report.iter_conflicts()] == [("core", 2), ("utils", 3)]
+
+
+def test_conflicts_passed_to_constructor():
+    """Test that conflicts given up front are indexed as well."""
+    report = DetailedConflictReport(conflicts={
+        "utils": [_module("utils", "package-a"), _module("utils", "package-b")],
+        "core": [_module("core", "package-a")],
+    })
+
+    assert report.get_conflict_count() == 1
+    assert [name for name, _ in report.iter_conflicts()] == ["utils"]
+    assert "core" not in str(report)
+
+
+def test_str():
+    """Test the text rendering of detailed reports."""
+    report = DetailedConflictReport()
+    report.add_conflict("utils", _module("utils", "package-a"))
+    report.add_conflict("utils", _module("utils", "package-b"))
+    report.set_severity("utils", "HIGH")
+    report.add_import_path("utils", "import utils")
+
+    assert str(report) == (
+        "Detected 1 module conflicts:\n"
+        "- [HIGH] Module 'utils' conflicts between packages: 'package-a', 'package-b'\n"
+        "  Used in:\n"
+        "  - import utils\n"
+    )
+    assert str(ConflictReport(conflicts=report.conflicts)) == (
+        "Detected 1 module conflicts:\n"
+        "- Module 'utils' conflicts between packages: 'package-a', 'package-b'\n"
+    )
+
+
+def test_severity_names_are_normalized():
+    """Test that severities set by name are stored as ordered ConflictSeverity members."""
+    report = DetailedConflictReport()
+    report.set_severity("utils", "HIGH")
+    report.set_severity("core", ConflictSeverity.LOW)
+
+    assert report.severities == {"utils": ConflictSeverity.HIGH, "core": ConflictSeverity.LOW}
+    assert ConflictSeverity.INFO < ConflictSeverity.MEDIUM < ConflictSeverity.CRITICAL
+    assert f"[{report.severities['utils']}]" == "[HIGH]"
+
+
+def test_module_info_is_compact_and_immutable():
+    """Test that module records have no __dict__ but still pickle and copy."""
+    module = _module("utils", "package-a")
+
+    assert not hasattr(module, "__dict__")
+    assert not hasattr(module.package, "__dict__")
+    with pytest.raises(AttributeError):
+        module.name = "other"
+
+    assert pickle.loads(pickle.dumps(module)) == module
+    assert copy.deepcopy(module) == module
+    assert len({module, copy.copy(module)}) == 1
+    assert pickle.loads(pickle.dumps(module.package)).label == module.package.label == "package-a (1.0.0)"
+
+
+def test_import_paths_sorted_and_cached():
+    """Test that import paths come back sorted and are re-sorted after additions."""
+    report = DetailedConflictReport()
+    report.add_import_path("utils", "b.py")
+    report.add_import_path("utils", "a.py")
+
+    paths = report.get_import_paths("utils")
+    assert paths == ("a.py", "b.py")
+    assert report.get_import_paths("utils") is paths
+    assert report.get_import_paths("core") == ()
+
+    report.add_import_path("utils", "0.py")
+    assert report.get_import_paths("utils") == ("0.py", "a.py", "b.py")
+
+
+def test_finalize_drops_single_providers():
+    """Test that finalizing keeps only the modules that are actual conflicts."""
+    report = ConflictReport()
+    report.add_conflict("core", _module("core", "package-a"))
+    report.add_conflict("utils", _module("utils", "package-a"))
+    report.add_conflict("utils", _module("utils", "package-b"))
+
+    report.finalize()
+
+    assert list(report.conflicts) == ["utils"]
+    assert report.get_conflict_count() == 1
+
+
+def test_packages_text_refreshed_after_add():
+    """Test that cached package names pick up modules added after rendering."""
+    report = ConflictReport()
+    report.add_conflict("utils", _module("utils", "package-a"))
+    report.add_conflict("utils", _module("utils", "package-b"))
+    assert "'package-a', 'package-b'\n" in str(report)
+
+    report.add_conflict("utils", _module("utils", "package-c"))
+    assert "'package-a', 'package-b', 'package-c'\n" in str(report)
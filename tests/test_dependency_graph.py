@@ -1,18 +1,120 @@
 """
 Tests for the dependency graph module.
 """
-import os
-import tempfile
-from pathlib import Path
-
 import pytest
 
 from modguard.dependency.graph import DependencyGraph, DependencyGraphBuilder, DependencyNode
 from modguard.models.conflict import PackageInfo
 
+# What the mocked TOML parser returns for the pyproject.toml fixtures
+PYPROJECT_DATA = {
+    "tool": {
+        "poetry": {
+            "dependencies": {
+                "python": "^3.7",
+                "package1": "1.0.0",
+                "package2": {"version": "^2.0.0", "extras": ["all"]},
+                "package3": {"git": "https://github.com/user/repo.git"}
+            }
+        }
+    },
+    "project": {
+        "dependencies": [
+            "package4>=4.0.0",
+            "package5"
+        ]
+    }
+}
+
+PROJECT_PYPROJECT_DATA = {
+    "tool": {
+        "poetry": {
+            "dependencies": {
+                "python": "^3.7",
+                "package3": "3.0.0"
+            }
+        }
+    }
+}
+
+
+class MockTomllib:
+    """Stand-in for the tomllib module that returns fixed data."""
+    
+    def __init__(self, data):
+        self.data = data
+    
+    def load(self, file):
+        return self.data
+
 
 @pytest.fixture
-def simple_graph():
+def mock_tomllib(monkeypatch):
+    """Replace the TOML parser of the graph builder; tests set the data it returns."""
+    tomllib = MockTomllib({})
+    monkeypatch.setattr("modguard.dependency.graph.tomllib", tomllib)
+    return tomllib
+
+
+@pytest.fixture(scope="session")
+def requirements_file(tmp_path_factory):
+    """Write a requirements.txt file once for all tests that only read it."""
+    path = tmp_path_factory.mktemp("requirements") / "requirements.txt"
+    path.write_text("""
+        # Comment line
+        package1==1.0.0
+        package2>=2.0.0
+        package3
+        package4 @ git+https://github.com/user/repo.git
+        """)
+    return path
+
+
+@pytest.fixture(scope="session")
+def pyproject_file(tmp_path_factory):
+    """Write a pyproject.toml file once for all tests that only read it."""
+    path = tmp_path_factory.mktemp("pyproject") / "pyproject.toml"
+    path.write_text("""
+        [tool.poetry]
+        name = "test-project"
+        version = "1.0.0"
+        
+        [tool.poetry.dependencies]
+        python = "^3.7"
+        package1 = "1.0.0"
+        package2 = {version = "^2.0.0", extras = ["all"]}
+        package3 = {git = "https://github.com/user/repo.git"}
+        
+        [project]
+        dependencies = [
+            "package4>=4.0.0",
+            "package5"
+        ]
+        """)
+    return path
+
+
+@pytest.fixture(scope="session")
+def project_dir(tmp_path_factory):
+    """Create a project with a requirements.txt and a pyproject.toml once."""
+    path = tmp_path_factory.mktemp("project")
+    (path / "requirements.txt").write_text("""
+            package1==1.0.0
+            package2>=2.0.0
+            """)
+    (path / "pyproject.toml").write_text("""
+            [tool.poetry]
+            name = "test-project"
+            version = "1.0.0"
+            
+            [tool.poetry.dependencies]
+            python = "^3.7"
+            package3 = "3.0.0"
+            """)
+    return path
+
+
+def _build_simple_graph():
     """Create a simple dependency graph for testing."""
     graph = DependencyGraph()
     
@@ -32,6 +134,12 @@ def simple_graph():
     return graph
 
 
+@pytest.fixture(scope="module")
+def simple_graph():
+    """A simple dependency graph shared by tests that only read it."""
+    return _build_simple_graph()
+
+
 def test_dependency_node():
     """Test the DependencyNode class."""
     pkg1 = PackageInfo(name="package1", version="1.0.0")
@@ -42,7 +150,11 @@ def test_dependency_node():
     
     # Test adding dependency
     node1.add_dependency(node2)
-    assert node2 in node1.dependencies
+    assert node1.dependencies["package2"] is node2
+    
+    # Test adding the same dependency twice keeps a single entry
+    node1.add_dependency(DependencyNode(PackageInfo(name="package2", version="2.1.0")))
+    assert list(node1.dependencies.values()) == [node2]
     
     # Test equality
     node1_dup = DependencyNode(PackageInfo(name="package1", version="1.1.0"))
@@ -84,144 +196,88 @@ def test_dependency_graph(simple_graph):
     assert "package3" in graph_str
 
 
-def test_parse_requirements_txt():
+def test_get_all_dependencies_with_cycle():
+    """Test that transitive dependency lookup terminates on cycles."""
+    graph = DependencyGraph()
+    pkg_a = PackageInfo(name="a", version="1.0.0")
+    pkg_b = PackageInfo(name="b", version="1.0.0")
+    pkg_c = PackageInfo(name="c", version="1.0.0")
+    
+    graph.add_dependency(pkg_a, pkg_b)
+    graph.add_dependency(pkg_b, pkg_c)
+    graph.add_dependency(pkg_c, pkg_a)
+    
+    assert graph.get_all_dependencies("b") == {pkg_a, pkg_b, pkg_c}
+    assert graph.get_all_dependencies("missing") == set()
+
+
+def test_get_all_dependencies_cache_invalidation():
+    """Test that memoized transitive dependencies are refreshed on graph changes."""
+    # This test changes the graph, so it gets its own
+    simple_graph = _build_simple_graph()
+    first = simple_graph.get_all_dependencies("root-project")
+    assert simple_graph.get_all_dependencies("root-project") is first
+    
+    pkg4 = PackageInfo(name="package4", version="4.0.0")
+    simple_graph.add_dependency(PackageInfo(name="package3", version="3.0.0"), pkg4)
+    
+    updated = simple_graph.get_all_dependencies("root-project")
+    assert pkg4 in updated
+    assert len(updated) == 4
+
+
+def test_from_project_shares_package_info(tmp_path):
+    """Test that equal packages parsed from different files share one instance."""
+    (tmp_path / "requirements.txt").write_text("package1==1.0.0\n")
+    (tmp_path / "requirements").mkdir()
+    (tmp_path / "requirements" / "dev.txt").write_text("package1==1.0.0\n")
+    
+    first = DependencyGraphBuilder.from_project(str(tmp_path))
+    second = DependencyGraphBuilder.from_project(str(tmp_path))
+    
+    assert first.nodes["package1"].package is second.nodes["package1"].package
+    assert first.nodes["package1"].package == PackageInfo(name="package1", version="1.0.0")
+
+
+def test_parse_requirements_txt(requirements_file):
     """Test parsing requirements.txt file."""
-    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
-        f.write("""
-        # Comment line
-        package1==1.0.0
-        package2>=2.0.0
-        package3
-        package4 @ git+https://github.com/user/repo.git
-        """)
-        req_file = f.name
+    requirements = DependencyGraphBuilder._parse_requirements_txt(str(requirements_file))
     
-    try:
-        requirements = DependencyGraphBuilder._parse_requirements_txt(req_file)
-        
-        assert len(requirements) == 4
-        assert ("package1", "1.0.0") in requirements
-        assert ("package2", ">=2.0.0") in requirements
-        assert ("package3", "latest") in requirements
-        assert ("package4", "latest") in requirements
-    finally:
-        os.unlink(req_file)
+    assert len(requirements) == 4
+    assert ("package1", "1.0.0") in requirements
+    assert ("package2", ">=2.0.0") in requirements
+    assert ("package3", "latest") in requirements
+    assert ("package4", "latest") in requirements
 
 
-def test_parse_pyproject_toml():
+def test_parse_pyproject_toml(pyproject_file, mock_tomllib):
     """Test parsing pyproject.toml file."""
-    with tempfile.NamedTemporaryFile("w", suffix=".toml", delete=False) as f:
-        f.write("""
-        [tool.poetry]
-        name = "test-project"
-        version = "1.0.0"
-        
-        [tool.poetry.dependencies]
-        python = "^3.7"
-        package1 = "1.0.0"
-        package2 = {version = "^2.0.0", extras = ["all"]}
-        package3 = {git = "https://github.com/user/repo.git"}
-        
-        [project]
-        dependencies = [
-            "package4>=4.0.0",
-            "package5"
-        ]
-        """)
-        pyproject_file = f.name
-    
-    try:
-        # Mock the toml import
-        with pytest.MonkeyPatch.context() as mp:
-            # Create a mock toml module
-            class MockToml:
-                @staticmethod
-                def load(file):
-                    return {
-                        "tool": {
-                            "poetry": {
-                                "dependencies": {
-                                    "python": "^3.7",
-                                    "package1": "1.0.0",
-                                    "package2": {"version": "^2.0.0", "extras": ["all"]},
-                                    "package3": {"git": "https://github.com/user/repo.git"}
-                                }
-                            }
-                        },
-                        "project": {
-                            "dependencies": [
-                                "package4>=4.0.0",
-                                "package5"
-                            ]
-                        }
-                    }
-            
-            mp.setattr("modguard.dependency.graph.toml", MockToml())
-            
-            requirements = DependencyGraphBuilder._parse_pyproject_toml(pyproject_file)
-            
-            assert len(requirements) >= 4
-            assert ("package1", "1.0.0") in requirements
-            assert ("package2", "^2.0.0") in requirements
-            # package3 might be handled differently since it has no version
-            assert any(pkg == "package4" and ver == ">=4.0.0" for pkg, ver in requirements)
-            assert any(pkg == "package5" for pkg, _ in requirements)
-    finally:
-        os.unlink(pyproject_file)
+    mock_tomllib.data = PYPROJECT_DATA
+    
+    requirements = DependencyGraphBuilder._parse_pyproject_toml(str(pyproject_file))
+    
+    assert len(requirements) >= 4
+    assert ("package1", "1.0.0") in requirements
+    assert ("package2", "^2.0.0") in requirements
+    # package3 might be handled differently since it has no version
+    assert any(pkg == "package4" and ver == ">=4.0.0" for pkg, ver in requirements)
+    assert any(pkg == "package5" for pkg, _ in requirements)
 
 
-def test_from_project():
+@pytest.mark.slow
+def test_from_project(project_dir, mock_tomllib):
     """Test building a dependency graph from a project directory."""
-    with tempfile.TemporaryDirectory() as temp_dir:
-        # Create requirements.txt
-        req_path = Path(temp_dir) / "requirements.txt"
-        with open(req_path, "w") as f:
-            f.write("""
-            package1==1.0.0
-            package2>=2.0.0
-            """)
-        
-        # Create pyproject.toml
-        pyproject_path = Path(temp_dir) / "pyproject.toml"
-        with open(pyproject_path, "w") as f:
-            f.write("""
-            [tool.poetry]
-            name = "test-project"
-            version = "1.0.0"
-            
-            [tool.poetry.dependencies]
-            python = "^3.7"
-            package3 = "3.0.0"
-            """)
-        
-        # Mock the toml import
-        with pytest.MonkeyPatch.context() as mp:
-            # Create a mock toml module
-            class MockToml:
-                @staticmethod
-                def load(file):
-                    return {
-                        "tool": {
-                            "poetry": {
-                                "dependencies": {
-                                    "python": "^3.7",
-                                    "package3": "3.0.0"
-                                }
-                            }
-                        }
-                    }
-            
-            mp.setattr("modguard.dependency.graph.toml", MockToml())
-            
-            # Build the graph
-            graph = DependencyGraphBuilder.from_project(temp_dir)
-            
-            # Check the graph
-            all_packages = graph.get_all_packages()
-            package_names = [pkg.name for pkg in all_packages]
-            
-            assert len(all_packages) == 4  # root + 3 dependencies
-            assert Path(temp_dir).name in package_names
-            assert "package1" in package_names
-            assert "package2" in package_names
-            assert "package3" in package_names
\ No newline at end of file
+    mock_tomllib.data = PROJECT_PYPROJECT_DATA
+    
+    # Build the graph
+    graph = DependencyGraphBuilder.from_project(str(project_dir))
+    
+    # Check the graph
+    all_packages = graph.get_all_packages()
+    package_names = [pkg.name for pkg in all_packages]
+    
+    assert len(all_packages) == 4  # root + 3 dependencies
+    assert project_dir.name in package_names
+    assert "package1" in package_names
+    assert "package2" in package_names
+    assert "package3" in package_names
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""
+Tests for the dependency resolver.
+"""
+import io
+import json
+from unittest import mock
+
+import pytest
+from packaging.requirements import Requirement
+
+from modguard.dependency import resolver
+from modguard.dependency.resolver import DependencyResolver
+
+
+@pytest.fixture(autouse=True)
+def clear_versions_cache():
+    """Make sure cached PyPI responses do not leak between tests."""
+    resolver._VERSIONS_CACHE.clear()
+    resolver._REQUIRES_CACHE.clear()
+    yield
+    resolver._VERSIONS_CACHE.clear()
+    resolver._REQUIRES_CACHE.clear()
+
+
+def _pypi_response(releases):
+    """Build a fake PyPI JSON API response."""
+    return io.BytesIO(json.dumps({"releases": releases}).encode("utf-8"))
+
+
+def test_get_available_versions():
+    """Test fetching and ordering versions from the PyPI JSON API."""
+    releases = {
+        "1.9.0": [{"yanked": False}],
+        "1.10.0": [{"yanked": False}],
+        "2.0.0rc1": [{"yanked": False}],
+        "1.10.1": [{"yanked": True}],
+        "0.1": [],
+        "not-a-version": [{"yanked": False}],
+    }
+
+    with mock.patch("urllib.request.urlopen", return_value=_pypi_response(releases)) as mock_urlopen:
+        versions = DependencyResolver.get_available_versions("package1")
+        assert versions == ["1.10.0", "1.9.0", "0.1"]
+
+        # A second lookup is served from the cache
+        assert DependencyResolver.get_available_versions("package1") == versions
+        assert mock_urlopen.call_count == 1
+
+
+def test_get_available_versions_network_error():
+    """Test that lookup failures yield no versions."""
+    with mock.patch("urllib.request.urlopen", side_effect=OSError("offline")):
+        assert DependencyResolver.get_available_versions("package1") == []
+
+
+def test_get_venv_is_shared():
+    """Test that the resolver venv is created once and reused."""
+    with mock.patch.object(DependencyResolver, "_venv", None), \
+            mock.patch.object(DependencyResolver, "_create_temp_venv",
+                              return_value=("/tmp/venv", "/tmp/venv/bin/pip")) as mock_create, \
+            mock.patch("atexit.register") as mock_register:
+        assert DependencyResolver._get_venv() == ("/tmp/venv", "/tmp/venv/bin/pip")
+        assert DependencyResolver._get_venv() == ("/tmp/venv", "/tmp/venv/bin/pip")
+
+        mock_create.assert_called_once()
+        mock_register.assert_called_once()
+
+
+@pytest.fixture
+def fake_index():
+    """Serve versions and requirements from an in-memory index instead of PyPI."""
+    versions = {
+        "app": ["2.0.0", "1.0.0"],
+        "lib": ["2.0.0", "1.0.0"],
+    }
+    requires = {
+        ("app", "2.0.0"): ["lib>=2.0"],
+        ("app", "1.0.0"): ["lib<2.0", "colorama; sys_platform == 'nonexistent'"],
+        ("lib", "2.0.0"): [],
+        ("lib", "1.0.0"): [],
+    }
+
+    with mock.patch.object(DependencyResolver, "get_available_versions",
+                           side_effect=lambda name: versions.get(name, [])), \
+            mock.patch.object(DependencyResolver, "_get_requirements",
+                              side_effect=lambda name, version: [
+                                  r for r in map(Requirement, requires[(name, version)])
+                                  if r.marker is None or r.marker.evaluate({"extra": ""})
+                              ]):
+        yield
+
+
+def test_check_compatibility_in_process(fake_index):
+    """Test resolving compatibility in-process with resolvelib."""
+    pytest.importorskip("resolvelib")
+
+    with mock.patch("subprocess.check_call") as mock_call:
+        assert DependencyResolver._check_compatibility(["app==2.0.0", "lib==2.0.0"])
+        assert DependencyResolver._check_compatibility(["app==1.0.0", "lib==1.0.0"])
+        assert not DependencyResolver._check_compatibility(["app==2.0.0", "lib==1.0.0"])
+        assert not DependencyResolver._check_compatibility(["missing==1.0.0"])
+        mock_call.assert_not_called()
+
+
+def test_find_compatible_versions(fake_index):
+    """Test finding a version compatible with the other pinned packages."""
+    pytest.importorskip("resolvelib")
+
+    packages = [
+        resolver.PackageInfo(name="app", version="2.0.0"),
+        resolver.PackageInfo(name="lib", version="1.0.0"),
+    ]
+
+    assert DependencyResolver.find_compatible_versions(packages, "app") == "1.0.0"
+
+
+def test_check_compatibility_without_resolvelib():
+    """Test falling back to pip when resolvelib is not installed."""
+    with mock.patch.dict("sys.modules", {"resolvelib": None}), \
+            mock.patch.object(DependencyResolver, "_check_compatibility_with_pip",
+                              return_value=True) as mock_pip:
+        assert DependencyResolver._check_compatibility(["app==1.0.0"])
+        mock_pip.assert_called_once_with(["app==1.0.0"])
+
+
+@pytest.mark.parametrize("first_compatible", [0, 1, 5, 37, 99, None])
+def test_find_newest_compatible_monotone(first_compatible):
+    """Test that the search finds the boundary in logarithmically many checks."""
+    versions = [f"1.{i}.0" for i in range(100, 0, -1)]
+    checked = []
+
+    def is_compatible(version):
+        checked.append(version)
+        return first_compatible is not None and versions.index(version) >= first_compatible
+
+    result = DependencyResolver._find_newest_compatible(versions, is_compatible)
+
+    if first_compatible is None:
+        assert result is None
+    else:
+        assert result == versions[first_compatible]
+        assert len(checked) <= 16
+
+
+def test_find_newest_compatible_non_monotone():
+    """Test falling back to a linear scan when compatibility is not monotone."""
+    versions = ["5.0", "4.0", "3.0", "2.0", "1.0"]
+
+    assert DependencyResolver._find_newest_compatible(versions, lambda v: v == "3.0") == "3.0"
+    assert DependencyResolver._find_newest_compatible([], lambda v: True) is None
@@ -1,156 +1,348 @@
 """
 Tests for the fix engine.
 """
+import importlib.util
 import os
-import unittest
-from unittest.mock import MagicMock, patch
+import sys
+from unittest.mock import patch
+
+import pytest
 
 from modguard.fix.engine import FixEngine
-from modguard.models.conflict import ConflictReport, ModuleInfo, PackageInfo
-from modguard.models.fix_plan import FixAction, FixPlan, FixResult, FixType
-
-
-class TestFixEngine(unittest.TestCase):
-    """Test the FixEngine class."""
-
-    def setUp(self):
-        """Set up test data."""
-        # Create package info objects
-        self.pkg_a = PackageInfo(name="package-a", version="1.0.0")
-        self.pkg_b = PackageInfo(name="package-b", version="2.0.0")
-        
-        # Create module info objects
-        self.module_a = ModuleInfo(name="utils", path="/path/to/package-a/utils.py", package=self.pkg_a)
-        self.module_b = ModuleInfo(name="utils", path="/path/to/package-b/utils.py", package=self.pkg_b)
-        
-        # Create a conflict report
-        self.report = ConflictReport()
-        self.report.add_conflict("utils", self.module_a)
-        self.report.add_conflict("utils", self.module_b)
-
-    def test_suggest_fixes(self):
-        """Test suggesting fixes for conflicts."""
-        # Suggest fixes
-        fix_plan = FixEngine.suggest_fixes(self.report)
-        
-        # Verify the fix plan
-        self.assertTrue(isinstance(fix_plan, FixPlan))
-        self.assertTrue(fix_plan.has_actions())
-        self.assertEqual(len(fix_plan.actions), 1)  # Should have one action for the conflict
-        
-        # Check that the action is correct
-        action = fix_plan.actions[0]
-        self.assertEqual(action.fix_type, FixType.RENAME_SHIM)
-        self.assertEqual(action.module_name, "utils")
-        self.assertEqual(action.package_name, "package-a")  # Should fix the first package by default
-        self.assertEqual(action.details.get("renamed_to"), "package_a.utils")
+from modguard.models.conflict import (
+    ConflictReport, ConflictSeverity, DetailedConflictReport, ModuleInfo, PackageInfo
+)
+from modguard.models.fix_plan import AppliedFix, FixAction, FixPlan, FixResult, FixType
+
+
+@pytest.fixture(scope="module")
+def pkg_a():
+    """First package providing the conflicting module."""
+    return PackageInfo(name="package-a", version="1.0.0")
+
+
+@pytest.fixture(scope="module")
+def pkg_b():
+    """Second package providing the conflicting module."""
+    return PackageInfo(name="package-b", version="2.0.0")
+
+
+@pytest.fixture(scope="module")
+def conflict_report(pkg_a, pkg_b):
+    """A plain report of one conflict, shared by tests that only read it."""
+    report = ConflictReport()
+    report.add_conflict("utils", ModuleInfo(name="utils", path="/path/to/package-a/utils.py", package=pkg_a))
+    report.add_conflict("utils", ModuleInfo(name="utils", path="/path/to/package-b/utils.py", package=pkg_b))
+    return report
+
+
+@pytest.mark.parametrize("severity, fix_type, package_names, detail", [
+    # Without import paths the first package by name is kept, the other one is shimmed
+    (ConflictSeverity.MEDIUM, FixType.RENAME_SHIM, ["package-b"], "renamed_to"),
+    # High severity conflicts get a version constraint for every package
+    (ConflictSeverity.HIGH, FixType.VERSION_CONSTRAINT, ["package-a", "package-b"], "new_version"),
+])
+def test_suggest_fixes(conflict_report, severity, fix_type, package_names, detail):
+    """Test suggesting fixes for conflicts of different severities."""
+    report = DetailedConflictReport(conflicts=conflict_report.conflicts)
+    report.set_severity("utils", severity)
+    
+    fix_plan = FixEngine.suggest_fixes(report)
     
-    def test_suggest_fix_with_version_constraint(self):
-        """Test suggesting a version constraint fix."""
-        # Create packages with different versions of the same module
-        pkg_a_v1 = PackageInfo(name="package-a", version="1.0.0")
-        pkg_a_v2 = PackageInfo(name="package-a", version="2.0.0")
-        
-        module_a_v1 = ModuleInfo(name="utils", path="/path/to/package-a/v1/utils.py", package=pkg_a_v1)
-        module_a_v2 = ModuleInfo(name="utils", path="/path/to/package-a/v2/utils.py", package=pkg_a_v2)
-        
-        # Create a conflict report
-        report = ConflictReport()
-        report.add_conflict("utils", module_a_v1)
-        report.add_conflict("utils", module_a_v2)
-        
-        # Suggest fixes with version constraints
-        fix_plan = FixEngine.suggest_fixes(report, prefer_version_constraint=True)
-        
-        # Verify the fix plan
-        self.assertTrue(fix_plan.has_actions())
-        self.assertEqual(len(fix_plan.actions), 1)
-        
-        # Check that the action is correct
-        action = fix_plan.actions[0]
-        self.assertEqual(action.fix_type, FixType.VERSION_CONSTRAINT)
-        self.assertEqual(action.module_name, "utils")
-        self.assertEqual(action.package_name, "package-a")
-        self.assertIn("new_version", action.details)
+    # Verify the fix plan
+    assert isinstance(fix_plan, FixPlan)
+    assert [action.package_name for action in fix_plan.actions] == package_names
+    for action in fix_plan.actions:
+        assert action.fix_type == fix_type
+        assert action.module_name == "utils"
+        assert detail in action.details
+
+
+def test_suggest_fixes_for_plain_report():
+    """Test that a report without severities gets the default (shim) fixes."""
+    report = ConflictReport()
+    for package_name in ["package-b", "package-a"]:
+        package = PackageInfo(name=package_name, version="1.0.0")
+        report.add_conflict("utils", ModuleInfo(name="utils", path=f"/{package_name}/utils.py", package=package))
+    
+    plan = FixEngine.suggest_fixes(report)
+    
+    assert plan.conflict_report is report
+    assert [(a.fix_type, a.package_name) for a in plan.actions] == [(FixType.RENAME_SHIM, "package-b")]
+
+
+@pytest.mark.parametrize("fix_type, details, changed_file, expected", [
+    (FixType.RENAME_SHIM, {"renamed_to": "package_a.utils"},
+     ".modguard/shims/redirects.json", '"utils": "package_a.utils"'),
+    (FixType.VERSION_CONSTRAINT, {"new_version": "1.1.0"},
+     "requirements.txt", "package-a==1.1.0\npackage-b==2.0.0"),
+])
+def test_apply_fix(conflict_report, tmp_path, fix_type, details, changed_file, expected):
+    """Test applying a single fix to a project."""
+    (tmp_path / "requirements.txt").write_text("package-a==1.0.0\npackage-b==2.0.0")
+    action = FixAction(fix_type=fix_type, module_name="utils", package_name="package-a", details=details)
     
-    @patch('importlib.util.find_spec')
-    def test_create_import_hook(self, mock_find_spec):
-        """Test creating an import hook."""
-        # Mock find_spec to return a spec for the module
-        mock_spec = MagicMock()
-        mock_spec.origin = self.module_a.path
-        mock_find_spec.return_value = mock_spec
-        
-        # Create an import hook
-        hook_module = FixEngine.create_import_hook("utils", "package_a.utils")
-        
-        # Verify the hook
-        self.assertIsNotNone(hook_module)
-        self.assertTrue(hasattr(hook_module, 'install'))
-        
-        # Test hook installation (would usually modify sys.meta_path)
-        with patch('sys.meta_path') as mock_meta_path:
-            mock_meta_path.insert = MagicMock()
-            hook_module.install()
-            mock_meta_path.insert.assert_called_once()
+    result = FixEngine.apply_fixes(FixPlan(conflict_report, actions=[action]), str(tmp_path))
     
-    def test_apply_rename_shim_fix(self):
-        """Test applying a rename shim fix."""
-        # Create a fix action
-        action = FixAction(
-            fix_type=FixType.RENAME_SHIM,
-            module_name="utils",
-            package_name="package-a",
-            details={"renamed_to": "package_a.utils"}
-        )
-        
-        # Apply the fix
-        with patch.object(FixEngine, 'create_import_hook', return_value=MagicMock()) as mock_create_hook:
-            result = FixEngine.apply_fix(action)
-            
-            # Verify the result
-            self.assertTrue(result.success)
-            mock_create_hook.assert_called_once_with("utils", "package_a.utils")
+    assert result.all_successful()
+    assert expected in (tmp_path / changed_file).read_text()
+
+
+def test_apply_fixes_dry_run(conflict_report, tmp_path):
+    """Test that a dry run reports every fix as applied without touching the project."""
+    plan = FixPlan(conflict_report)
+    plan.add_action(FixAction(
+        fix_type=FixType.RENAME_SHIM,
+        module_name="utils",
+        package_name="package-a",
+        details={"renamed_to": "package_a.utils"}
+    ))
     
-    def test_apply_version_constraint_fix(self):
-        """Test applying a version constraint fix."""
-        # Create a fix action
-        action = FixAction(
-            fix_type=FixType.VERSION_CONSTRAINT,
-            module_name="utils",
-            package_name="package-a",
-            details={"new_version": "1.1.0"}
-        )
-        
-        # Apply the fix
-        with patch('os.path.exists', return_value=True):
-            with patch('builtins.open', unittest.mock.mock_open(read_data="package-a==1.0.0\npackage-b==2.0.0")):
-                with patch('builtins.open', unittest.mock.mock_open()) as mock_write:
-                    result = FixEngine.apply_fix(action)
-                    
-                    # Verify the result
-                    self.assertTrue(result.success)
+    result = FixEngine.apply_fixes(plan, str(tmp_path), dry_run=True)
     
-    def test_apply_fix_plan(self):
-        """Test applying a fix plan."""
-        # Create a fix plan
-        plan = FixPlan(self.report)
-        plan.add_action(FixAction(
-            fix_type=FixType.RENAME_SHIM,
-            module_name="utils",
-            package_name="package-a",
-            details={"renamed_to": "package_a.utils"}
-        ))
-        
-        # Apply the fix plan
-        with patch.object(FixEngine, 'apply_fix', return_value=MagicMock(success=True)) as mock_apply_fix:
-            result = FixEngine.apply_fix_plan(plan)
-            
-            # Verify the result
-            self.assertTrue(result.all_successful())
-            self.assertEqual(result.success_count(), 1)
-            mock_apply_fix.assert_called_once()
-
-
-if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    assert result.all_successful()
+    assert result.success_count() == 1
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_actions_by_module_and_package():
+    """Test that fix plan lookups return matching actions in plan order."""
+    actions = [
+        FixAction(fix_type=FixType.MANUAL, module_name=module_name, package_name=package_name)
+        for module_name, package_name in [("utils", "package-a"), ("core", "package-a"), ("utils", "package-b")]
+    ]
+    plan = FixPlan(ConflictReport(), actions=actions[:1])
+    for action in actions[1:]:
+        plan.add_action(action)
+
+    assert plan.get_actions_for_module("utils") == [actions[0], actions[2]]
+    assert plan.get_actions_for_package("package-a") == [actions[0], actions[1]]
+    assert plan.get_actions_for_module("missing") == []
+    # Callers get their own lists
+    plan.get_actions_for_module("utils").clear()
+    assert len(plan.get_actions_for_module("utils")) == 2
+
+
+def test_fix_result_counts():
+    """Test success and failure totals of a fix result."""
+    action = FixAction(fix_type=FixType.MANUAL, module_name="utils", package_name="package-a")
+    result = FixResult(FixPlan(ConflictReport()), applied_fixes=[AppliedFix(action, True)])
+    assert result.all_successful()
+
+    result.add_result(AppliedFix(action, False))
+    result.add_result(AppliedFix(action, True))
+
+    assert (result.success_count(), result.failure_count()) == (2, 1)
+    assert not result.all_successful()
+    assert str(result).startswith("Applied 2/3 fixes:")
+
+
+def test_action_rendered_once():
+    """Test that an action's description is built on first use and reused."""
+    action = FixAction(fix_type=FixType.VERSION_CONSTRAINT, module_name="utils", package_name="package-a",
+                       details={"new_version": "2.0.0"})
+    with patch.object(FixAction, "_render", autospec=True, side_effect=FixAction._render) as mock_render:
+        assert str(action) == "Update 'package-a' to version 2.0.0"
+        assert f"- {action}" == "- Update 'package-a' to version 2.0.0"
+    mock_render.assert_called_once()
+    assert action == FixAction(fix_type=FixType.VERSION_CONSTRAINT, module_name="utils",
+                               package_name="package-a", details={"new_version": "2.0.0"})
+
+
+def test_preferred_packages_ranked_by_import_frequency():
+    """Test that packages named in more import paths come first."""
+    report = DetailedConflictReport()
+    for package_name in ["alpha", "beta", "gamma"]:
+        package = PackageInfo(name=package_name, version="1.0.0")
+        report.add_conflict("utils", ModuleInfo(name="utils", path=f"/{package_name}/utils.py", package=package))
+    for import_path in ["import beta.utils", "from beta import utils", "import alpha.utils"]:
+        report.add_import_path("utils", import_path)
+
+    assert FixEngine._get_preferred_packages("utils", report) == ["beta", "alpha"]
+
+
+def test_preferred_packages_counted_per_providing_module():
+    """Test that a package providing the module twice counts once per module."""
+    report = DetailedConflictReport()
+    alpha = PackageInfo(name="alpha", version="1.0.0")
+    beta = PackageInfo(name="beta", version="1.0.0")
+    for path in ["/alpha/utils.py", "/alpha/vendor/utils.py"]:
+        report.add_conflict("utils", ModuleInfo(name="utils", path=path, package=alpha))
+    report.add_conflict("utils", ModuleInfo(name="utils", path="/beta/utils.py", package=beta))
+    for import_path in ["import alpha.utils", "from alpha import utils",
+                        "import beta.utils", "from beta import utils", "from beta.utils import x"]:
+        report.add_import_path("utils", import_path)
+
+    # alpha: 2 paths x 2 modules, beta: 3 paths x 1 module
+    assert FixEngine._get_preferred_packages("utils", report) == ["alpha", "beta"]
+
+
+def _version_action(package_name="package-a", new_version="1.1.0"):
+    """Build a version constraint fix for a package."""
+    return FixAction(
+        fix_type=FixType.VERSION_CONSTRAINT,
+        module_name="utils",
+        package_name=package_name,
+        details={"new_version": new_version}
+    )
+
+
+def test_version_fix_requirements_txt(tmp_path):
+    """Test updating a pinned package in requirements.txt."""
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text("package-a==1.0.0\npackage-b>=2.0.0\n")
+
+    applied = FixEngine._apply_version_constraint_fix(_version_action(), str(tmp_path))
+
+    assert applied.success
+    assert requirements.read_text() == "package-a==1.1.0\npackage-b>=2.0.0\n"
+
+
+def test_version_fix_package_name_is_literal(tmp_path):
+    """Test that dots in package names don't match other characters."""
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text("zope-interface==5.0\n")
+
+    FixEngine._apply_version_constraint_fix(_version_action("zope.interface", "6.0"), str(tmp_path))
+
+    assert "zope-interface==5.0" in requirements.read_text()
+
+
+def test_version_fix_pyproject_toml(tmp_path):
+    """Test updating a Poetry dependency in pyproject.toml."""
+    pyproject = tmp_path / "pyproject.toml"
+    pyproject.write_text('[tool.poetry.dependencies]\npackage-a = "1.0.0"\n')
+
+    applied = FixEngine._apply_version_constraint_fix(_version_action(), str(tmp_path))
+
+    assert applied.success
+    assert 'package-a = "1.1.0"' in pyproject.read_text()
+
+
+def test_version_fix_without_dependency_files(tmp_path):
+    """Test that a project without dependency files reports a failure."""
+    applied = FixEngine._apply_version_constraint_fix(_version_action(), str(tmp_path))
+
+    assert not applied.success
+    assert applied.details == "No requirements.txt or pyproject.toml found"
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_apply_fixes_rewrites_file_once(tmp_path):
+    """Test that several version fixes share a single read and write."""
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text("package-a==1.0.0\npackage-b==2.0.0\n")
+    plan = FixPlan(ConflictReport())
+    plan.add_action(_version_action("package-a", "1.1.0"))
+    plan.add_action(_version_action("package-b", "2.1.0"))
+    plan.add_action(FixAction(
+        fix_type=FixType.MANUAL,
+        module_name="utils",
+        package_name="package-c",
+        details={}
+    ))
+
+    with patch('builtins.open', wraps=open) as mock_open:
+        result = FixEngine.apply_fixes(plan, str(tmp_path))
+
+    # requirements.txt is read and written once for both fixes
+    modes = [call.args[1] if len(call.args) > 1 else 'r'
+             for call in mock_open.call_args_list if call.args[0] == str(requirements)]
+    assert modes == ['r', 'w']
+    assert [applied.success for applied in result.applied_fixes] == [True, True, False]
+    assert requirements.read_text() == "package-a==1.1.0\npackage-b==2.1.0\n"
+
+
+@pytest.fixture
+def shim_project(tmp_path):
+    """A temporary project with nested packages."""
+    for rel_path in ["aaa/deep/pkg/__init__.py", "mypkg/__init__.py", "mypkg/sub/__init__.py"]:
+        path = tmp_path / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+    return tmp_path
+
+
+def _shim_action(module_name="utils", package_name="package-a"):
+    """Build a rename shim fix redirecting a module into a package."""
+    return FixAction(
+        fix_type=FixType.RENAME_SHIM,
+        module_name=module_name,
+        package_name=package_name,
+        details={"renamed_to": f"{package_name.replace('-', '_')}.{module_name}"}
+    )
+
+
+def test_find_project_init_prefers_shallowest(shim_project):
+    """Test that the top-level package is found before deeper ones."""
+    assert FixEngine._find_project_init(str(shim_project)) == str(shim_project / "mypkg" / "__init__.py")
+
+
+def test_find_project_init_from_metadata(shim_project):
+    """Test that the package declared in pyproject.toml is used directly."""
+    (shim_project / "pyproject.toml").write_text('[project]\nname = "my-app"\n')
+    init_path = shim_project / "src" / "my_app" / "__init__.py"
+    init_path.parent.mkdir(parents=True)
+    init_path.touch()
+
+    with patch('os.scandir') as mock_scandir, patch('builtins.open', wraps=open) as mock_open:
+        assert FixEngine._find_project_init(str(shim_project)) == str(init_path)
+
+    # The declared package is opened directly, without searching the tree
+    assert mock_open.call_args_list[-1].args[0] == str(init_path)
+    mock_scandir.assert_not_called()
+
+
+def test_find_project_init_none(tmp_path):
+    """Test projects without any package."""
+    assert FixEngine._find_project_init(str(tmp_path)) is None
+
+
+def test_apply_fixes_searches_once(shim_project):
+    """Test that several shim fixes share one __init__.py lookup."""
+    plan = FixPlan(ConflictReport())
+    for package_name in ["package-a", "package-b"]:
+        plan.add_action(_shim_action(package_name=package_name))
+
+    with patch.object(FixEngine, '_find_project_init', wraps=FixEngine._find_project_init) as mock_find:
+        result = FixEngine.apply_fixes(plan, str(shim_project))
+
+    mock_find.assert_called_once_with(str(shim_project))
+    assert result.all_successful()
+    assert (shim_project / "mypkg" / "__init__.py").read_text().count("import modguard.shims") == 1
+
+
+def test_shims_share_one_finder(shim_project, monkeypatch):
+    """Test that all redirects are served by a single installed finder."""
+    for module_name in ["utils", "helpers"]:
+        assert FixEngine._apply_shim_fix(_shim_action(module_name), str(shim_project), "").success
+
+    shim_dir = shim_project / ".modguard" / "shims"
+    assert sorted(os.listdir(shim_dir)) == ["__init__.py", "redirects.json"]
+
+    # Loading the shim package twice still installs just one finder
+    monkeypatch.setattr(sys, "meta_path", list(sys.meta_path))
+    for _ in range(2):
+        spec = importlib.util.spec_from_file_location("shims", shim_dir / "__init__.py")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+
+    finders = [f for f in sys.meta_path if type(f).__name__ == "ModGuardShimFinder"]
+    assert len(finders) == 1
+    assert module._REDIRECTS == {"helpers": "package_a.helpers", "utils": "package_a.utils"}
+    assert finders[0].find_spec("unrelated", None) is None
+
+
+def test_old_shim_package_is_kept(shim_project):
+    """Test that a shim package from before redirects.json is not overwritten."""
+    shim_dir = shim_project / ".modguard" / "shims"
+    shim_dir.mkdir(parents=True)
+    init_file = shim_dir / "__init__.py"
+    init_file.write_text("# Generated by ModGuard - DO NOT EDIT\nfrom .shim_package-b_helpers import *\n")
+
+    applied = FixEngine._apply_shim_fix(_shim_action(), str(shim_project), "")
+
+    assert not applied.success
+    assert "older version of ModGuard" in applied.details
+    assert "from .shim_package-b_helpers import *" in init_file.read_text()
+    assert os.listdir(shim_dir) == ["__init__.py"]
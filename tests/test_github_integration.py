@@ -0,0 +1,122 @@
+"""
+Tests for the GitHub Actions integration.
+"""
+import io
+from unittest import mock
+
+import pytest
+
+from modguard.integrations.github import GitHubActionReporter
+from modguard.models.conflict import ConflictReport, ConflictSeverity, DetailedConflictReport, ModuleInfo, PackageInfo
+from modguard.models.fix_plan import FixAction, FixPlan, FixType
+
+
+def _add_utils_conflict(report):
+    for package_name in ["package-a", "package-b"]:
+        package = PackageInfo(name=package_name, version="1.0.0")
+        report.add_conflict("utils", ModuleInfo(name="utils", path=f"/{package_name}/utils.py", package=package))
+
+
+@pytest.fixture
+def github_actions(monkeypatch):
+    """Pretend to run inside GitHub Actions."""
+    monkeypatch.setenv("GITHUB_ACTIONS", "true")
+
+
+def test_report_conflicts_detailed(github_actions):
+    """Test that severities and import paths of detailed reports are used."""
+    report = DetailedConflictReport()
+    _add_utils_conflict(report)
+    report.set_severity("utils", "HIGH")
+    report.add_import_path("utils", "app.py")
+
+    annotations = list(GitHubActionReporter.report_conflicts(report))
+
+    assert annotations == [
+        "::error file=app.py::Module 'utils' has namespace conflicts between packages: "
+        "package-a (1.0.0), package-b (1.0.0)"
+    ]
+
+
+def test_write_annotations_single_write(github_actions):
+    """Test that all annotations reach the stream in one write."""
+    report = ConflictReport()
+    _add_utils_conflict(report)
+    stream = mock.Mock(wraps=io.StringIO())
+
+    GitHubActionReporter.write_annotations(report, stream)
+
+    stream.write.assert_called_once()
+    stream.flush.assert_called_once()
+    assert stream.getvalue().startswith("::warning::Module 'utils'")
+
+
+def test_severity_to_annotation_type():
+    """Test mapping severities, and their legacy string names, to annotation types."""
+    expected = {
+        ConflictSeverity.INFO: "notice",
+        ConflictSeverity.LOW: "notice",
+        ConflictSeverity.MEDIUM: "warning",
+        ConflictSeverity.HIGH: "error",
+        ConflictSeverity.CRITICAL: "error",
+    }
+    for severity, annotation_type in expected.items():
+        assert GitHubActionReporter.severity_to_annotation_type(severity) == annotation_type
+        assert GitHubActionReporter.severity_to_annotation_type(severity.name) == annotation_type
+    assert GitHubActionReporter.severity_to_annotation_type("UNKNOWN") == "warning"
+
+
+def test_output_batch_opens_file_once(tmp_path, monkeypatch):
+    """Test that outputs set inside output_batch share one file handle."""
+    output_file = tmp_path / "github_output"
+    monkeypatch.setenv("GITHUB_ACTIONS", "true")
+    monkeypatch.setenv("GITHUB_OUTPUT", str(output_file))
+
+    with mock.patch("builtins.open", wraps=open) as mock_open:
+        with GitHubActionReporter.output_batch():
+            GitHubActionReporter.set_output("conflicts", "2")
+            GitHubActionReporter.set_output("modules", ["utils", "core"])
+
+    mock_open.assert_called_once()
+    assert GitHubActionReporter._output_fp is None
+    assert output_file.read_text() == 'conflicts<<EOF\n2\nEOF\nmodules<<EOF\n["utils", "core"]\nEOF\n'
+
+    GitHubActionReporter.set_output("fixed", "0")
+    assert output_file.read_text().endswith("fixed<<EOF\n0\nEOF\n")
+
+
+def test_get_annotation_command():
+    """Test that location parameters are only included when their parents are given."""
+    command = GitHubActionReporter.get_annotation_command
+    assert command("error", "msg") == "::error::msg"
+    assert command("error", "msg", line=3) == "::error::msg"
+    assert command("warning", "msg", file="app.py") == "::warning file=app.py::msg"
+    assert command("warning", "msg", file="app.py", col=2) == "::warning file=app.py::msg"
+    assert command("notice", "msg", file="app.py", line=3) == "::notice file=app.py,line=3::msg"
+    assert command("notice", "msg", file="app.py", line=3, col=2) == "::notice file=app.py,line=3,col=2::msg"
+
+
+def test_report_fix_plan(github_actions):
+    """Test that each suggested fix becomes a notice, produced lazily."""
+    plan = FixPlan(ConflictReport(), actions=[
+        FixAction(fix_type=FixType.MANUAL, module_name="utils", package_name=package_name)
+        for package_name in ["package-a", "package-b"]
+    ])
+
+    annotations = GitHubActionReporter.report_fix_plan(plan)
+
+    assert next(annotations) == "::notice::Suggested fix: Manual intervention required for 'utils' in 'package-a'"
+    assert len(list(annotations)) == 1
+
+
+def test_no_annotations_outside_github_actions(monkeypatch):
+    """Test that nothing is formatted or written when not running in GitHub Actions."""
+    monkeypatch.delenv("GITHUB_ACTIONS", raising=False)
+    report = ConflictReport()
+    _add_utils_conflict(report)
+    stream = mock.Mock()
+
+    assert list(GitHubActionReporter.report_conflicts(report)) == []
+    assert list(GitHubActionReporter.report_fix_plan(FixPlan(report))) == []
+    GitHubActionReporter.write_annotations(report, stream)
+    stream.write.assert_not_called()
@@ -1,33 +1,61 @@
 """
 Tests for the module extractor.
 """
+import importlib.metadata
 import os
+import shutil
+import subprocess
+import sys
+import tempfile
 import unittest
-from unittest.mock import MagicMock, patch
+import warnings
+from unittest.mock import DEFAULT, MagicMock, patch
 
+import pytest
+
+from modguard.dependency.graph import DependencyGraphBuilder
 from modguard.extractor.module_extractor import ModuleExtractor
 from modguard.models.conflict import ModuleInfo, PackageInfo
 
+# Files of the installed package laid out by test_get_package_modules
+PACKAGE_FILES = (
+    "__init__.py", "module1.py", "module2.py", "README.txt",
+    "subdir/__init__.py", "subdir/submodule.py",
+    "__pycache__/module1.cpython-39.pyc", "__pycache__/cached.py",
+)
+
+# Lines printed by the extractor script, one JSON object per module
+EXTRACTOR_OUTPUT = (
+    '{"name": "module1", "path": "/path/to/package/module1.py", "full_name": "module1"}\n',
+    '{"name": "module2", "path": "/path/to/package/module2.py", "full_name": "module2"}\n',
+)
+
 
 class TestModuleExtractor(unittest.TestCase):
     """Test the ModuleExtractor class."""
 
+    def setUp(self):
+        """Start every test with empty metadata caches."""
+        ModuleExtractor.clear_caches()
+        self.addCleanup(ModuleExtractor.clear_caches)
+
     @patch('importlib.metadata.distribution')
-    @patch('os.walk')
-    def test_get_package_modules(self, mock_walk, mock_distribution):
+    def test_get_package_modules(self, mock_distribution):
         """Test extracting modules from an installed package."""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        
         # Mock the package metadata
-        mock_dist = MagicMock()
+        mock_dist = MagicMock(spec=importlib.metadata.Distribution)
         mock_dist.version = "1.0.0"
-        mock_dist.locate_file.return_value = "/path/to/package/__init__.py"
+        mock_dist.locate_file.return_value = os.path.join(temp_dir, "__init__.py")
         mock_distribution.return_value = mock_dist
         
-        # Mock the file system
-        mock_walk.return_value = [
-            ("/path/to/package", ["subdir"], ["__init__.py", "module1.py", "module2.py"]),
-            ("/path/to/package/subdir", [], ["__init__.py", "submodule.py"]),
-            ("/path/to/package/__pycache__", [], ["module1.cpython-39.pyc"]),
-        ]
+        # Create the file system
+        for rel_path in PACKAGE_FILES:
+            path = os.path.join(temp_dir, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, "w").close()
         
         # Extract modules
         modules = ModuleExtractor._get_package_modules("test-package")
@@ -43,7 +71,25 @@ class TestModuleExtractor(unittest.TestCase):
         for module in modules:
             self.assertEqual(module.package.name, "test-package")
             self.assertEqual(module.package.version, "1.0.0")
+        
+        # A second lookup is served from the cache
+        self.assertEqual(ModuleExtractor._get_package_modules("test-package"), modules)
+        mock_distribution.assert_called_once_with("test-package")
+    
+    def test_walk_modules_full_names(self):
+        """Test that nested modules get dotted full names."""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        for rel_path in ["top.py", "pkg/__init__.py", "pkg/inner/leaf.py"]:
+            path = os.path.join(temp_dir, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, "w").close()
+        
+        walked = {(name, full_name) for name, _, full_name in ModuleExtractor._walk_modules(temp_dir)}
+        
+        self.assertSetEqual(walked, {("top", "top"), ("leaf", "pkg.inner.leaf")})
     
+    @pytest.mark.slow
     @patch('subprocess.check_call')
     @patch('venv.create')
     def test_virtual_env_setup(self, mock_create, mock_check_call):
@@ -63,24 +109,13 @@ class TestModuleExtractor(unittest.TestCase):
         self.assertTrue(result)
         mock_check_call.assert_called_once()
     
-    @patch('subprocess.check_output')
-    def test_run_extractor_script(self, mock_check_output):
+    @patch('subprocess.Popen')
+    def test_run_extractor_script(self, mock_popen):
         """Test running the extractor script in a virtual environment."""
-        # Mock the script output
-        mock_check_output.return_value = """
-        [
-            {
-                "name": "module1",
-                "path": "/path/to/package/module1.py",
-                "full_name": "module1"
-            },
-            {
-                "name": "module2",
-                "path": "/path/to/package/module2.py",
-                "full_name": "module2"
-            }
-        ]
-        """
+        # Mock the script output, one JSON object per line
+        proc = mock_popen.return_value.__enter__.return_value
+        proc.stdout = iter(EXTRACTOR_OUTPUT)
+        proc.returncode = 0
         
         # Run the extractor script
         modules = ModuleExtractor._run_extractor_script("/tmp/test-venv", "test-package")
@@ -90,6 +125,56 @@ class TestModuleExtractor(unittest.TestCase):
         self.assertEqual(modules[0]["name"], "module1")
         self.assertEqual(modules[1]["name"], "module2")
     
+    @patch('subprocess.Popen')
+    def test_run_extractor_script_compiles_cleanly(self, mock_popen):
+        """Test that the generated script compiles without warnings for both modes."""
+        sources = []
+        def popen(args, **kwargs):
+            with open(args[1]) as f:
+                sources.append(f.read())
+            proc = MagicMock()
+            proc.__enter__.return_value.stdout = iter(())
+            proc.__enter__.return_value.returncode = 0
+            return proc
+        mock_popen.side_effect = popen
+        
+        ModuleExtractor._run_extractor_script("/tmp/test-venv", "test-package")
+        ModuleExtractor._run_extractor_script("/tmp/test-venv", "test-package", "/tmp/target")
+        
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            for source in sources:
+                compile(source, "<extractor>", "exec")
+        self.assertIn("if False:", sources[0])
+        self.assertIn("if True:", sources[1])
+    
+    @pytest.mark.slow
+    @unittest.skipIf(sys.platform == 'win32', "uses a POSIX venv layout")
+    def test_run_extractor_script_streams_modules(self):
+        """Test the generated script end to end with the current interpreter."""
+        target = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, target)
+        files = {
+            "foo/bar.py": "",
+            "foo-1.0.dist-info/METADATA": "Metadata-Version: 2.1\nName: foo\nVersion: 1.0\n",
+            "foo-1.0.dist-info/RECORD": "foo/bar.py,,\n",
+        }
+        for rel_path, content in files.items():
+            path = os.path.join(target, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(content)
+        
+        # A stand-in venv whose interpreter is the one running the tests
+        venv_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, venv_path)
+        os.mkdir(os.path.join(venv_path, 'bin'))
+        os.symlink(sys.executable, os.path.join(venv_path, 'bin', 'python'))
+        
+        modules = ModuleExtractor._run_extractor_script(venv_path, "foo", target)
+        
+        self.assertEqual([m["full_name"] for m in modules], ["foo.bar"])
+    
     @patch.object(ModuleExtractor, '_get_package_modules')
     def test_extract_modules_from_package_direct(self, mock_get_modules):
         """Test extracting modules from a package directly."""
@@ -108,13 +193,15 @@ class TestModuleExtractor(unittest.TestCase):
         self.assertEqual(modules, mock_modules)
         mock_get_modules.assert_called_once_with("test-package")
     
-    @patch.object(ModuleExtractor, '_install_package')
-    @patch.object(ModuleExtractor, '_create_virtual_env')
-    @patch.object(ModuleExtractor, '_run_extractor_script')
-    def test_extract_modules_from_package_venv(self, mock_run_script, mock_create_venv, mock_install):
+    @patch.multiple(ModuleExtractor, _install_package=DEFAULT, _get_shared_venv=DEFAULT,
+                    _run_extractor_script=DEFAULT)
+    def test_extract_modules_from_package_venv(self, **mocks):
         """Test extracting modules from a package using a virtual environment."""
+        mock_install = mocks['_install_package']
+        mock_run_script = mocks['_run_extractor_script']
+        
         # Mock the virtual environment setup
-        mock_create_venv.return_value = None
+        mocks['_get_shared_venv'].return_value = "/tmp/test-venv"
         mock_install.return_value = True
         
         # Mock the script output
@@ -140,6 +227,149 @@ class TestModuleExtractor(unittest.TestCase):
         self.assertEqual(modules[1].name, "module2")
         self.assertEqual(modules[0].package.name, "test-package")
         self.assertEqual(modules[0].package.version, "1.0.0")
+        
+        # The package is installed into its own directory of the shared venv
+        target = ModuleExtractor._get_target_dir("/tmp/test-venv", "test-package==1.0.0")
+        mock_install.assert_called_once_with("/tmp/test-venv", "test-package==1.0.0", target)
+        mock_run_script.assert_called_once_with("/tmp/test-venv", "test-package", target)
+    
+    @patch('atexit.register')
+    @patch.object(ModuleExtractor, '_create_virtual_env')
+    def test_get_shared_venv(self, mock_create_venv, mock_register):
+        """Test that the extraction venv is created once and reused."""
+        with patch.object(ModuleExtractor, '_shared_venv_path', None):
+            venv_path = ModuleExtractor._get_shared_venv()
+            self.addCleanup(shutil.rmtree, venv_path, True)
+            
+            self.assertEqual(ModuleExtractor._get_shared_venv(), venv_path)
+            mock_create_venv.assert_called_once_with(venv_path)
+            mock_register.assert_called_once()
+    
+    def test_get_target_dir(self):
+        """Test that target directories are distinct per version and path-safe."""
+        first = ModuleExtractor._get_target_dir("/tmp/venv", "package==1.0.0")
+        second = ModuleExtractor._get_target_dir("/tmp/venv", "package==2.0.0")
+        
+        self.assertNotEqual(first, second)
+        self.assertNotIn("=", os.path.basename(first))
+    
+    @patch.object(ModuleExtractor, 'extract_modules_from_package')
+    def test_extract_modules_from_dependency_graph(self, mock_extract):
+        """Test extracting modules for every package in a graph."""
+        packages = [PackageInfo(name=f"package{i}", version=None) for i in range(5)]
+        graph = MagicMock()
+        graph.get_all_packages.return_value = packages
+        mock_extract.side_effect = lambda name: [
+            ModuleInfo(name=name, path=f"/path/to/{name}.py", package=PackageInfo(name=name, version="1.0.0"))
+        ]
+        
+        result = ModuleExtractor.extract_modules_from_dependency_graph(graph)
+        
+        # Results are keyed by package name, in graph order
+        self.assertEqual(list(result), [p.name for p in packages])
+        self.assertEqual(result["package3"][0].name, "package3")
+        self.assertEqual(mock_extract.call_count, 5)
+    
+    @patch.object(ModuleExtractor, '_run_extractor_script')
+    def test_extract_from_target_in_process(self, mock_run_script):
+        """Test reading modules of a --target install without a subprocess."""
+        target = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, target)
+        files = {
+            "foo/__init__.py": "",
+            "foo/bar.py": "",
+            "foo/sub/baz.py": "",
+            "other/unrelated.py": "",
+            "foo-1.0.dist-info/METADATA": "Metadata-Version: 2.1\nName: foo\nVersion: 1.0\n",
+            "foo-1.0.dist-info/RECORD": "foo/__init__.py,,\nfoo/bar.py,,\nfoo/sub/baz.py,,\n../../bin/foo,,\n",
+        }
+        for rel_path, content in files.items():
+            path = os.path.join(target, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(content)
+        
+        modules = ModuleExtractor._extract_from_target("/tmp/test-venv", "foo", "1.0", target)
+        
+        self.assertSetEqual({m.name for m in modules}, {"bar", "baz"})
+        self.assertEqual(modules[0].package.version, "1.0")
+        mock_run_script.assert_not_called()
+    
+    @patch('subprocess.check_call')
+    def test_install_packages(self, mock_check_call):
+        """Test installing several packages with one pip invocation."""
+        result = ModuleExtractor._install_packages("/tmp/test-venv", ["a==1.0", "b==2.0"], "/tmp/target")
+        
+        self.assertEqual(result, {"a==1.0": True, "b==2.0": True})
+        mock_check_call.assert_called_once()
+        cmd = mock_check_call.call_args[0][0]
+        self.assertIn("a==1.0", cmd)
+        self.assertIn("b==2.0", cmd)
+    
+    @patch('subprocess.check_call')
+    def test_install_packages_retries_individually(self, mock_check_call):
+        """Test that a failing batch is retried one spec at a time."""
+        def check_call(cmd, **kwargs):
+            if "bad==1.0" in cmd:
+                raise subprocess.CalledProcessError(1, cmd)
+            return 0
+        mock_check_call.side_effect = check_call
+        
+        result = ModuleExtractor._install_packages("/tmp/test-venv", ["good==1.0", "bad==1.0"])
+        
+        self.assertEqual(result, {"good==1.0": True, "bad==1.0": False})
+        self.assertEqual(mock_check_call.call_count, 3)
+    
+    @patch.object(ModuleExtractor, '_extract_from_target')
+    @patch.object(ModuleExtractor, '_install_packages')
+    @patch.object(ModuleExtractor, '_get_shared_venv')
+    def test_extract_modules_from_dependency_graph_batch(self, mock_get_venv, mock_install, mock_extract):
+        """Test that pinned graph packages are installed in a single batch."""
+        venv_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, venv_path)
+        mock_get_venv.return_value = venv_path
+        mock_install.return_value = {"good==1.0.0": True, "bad==2.0.0": False}
+        mock_extract.return_value = []
+        
+        graph = MagicMock()
+        graph.get_all_packages.return_value = [
+            PackageInfo(name="good", version="1.0.0"),
+            PackageInfo(name="bad", version="2.0.0"),
+        ]
+        
+        result = ModuleExtractor.extract_modules_from_dependency_graph(graph)
+        
+        self.assertEqual(result, {"good": [], "bad": []})
+        mock_install.assert_called_once()
+        self.assertEqual(mock_install.call_args[0][1], ["good==1.0.0", "bad==2.0.0"])
+        mock_extract.assert_called_once()
+        self.assertEqual(mock_extract.call_args[0][1], "good")
+    
+    @patch.object(ModuleExtractor, '_extract_from_target')
+    @patch.object(ModuleExtractor, '_install_packages')
+    @patch.object(ModuleExtractor, '_get_shared_venv')
+    def test_extract_modules_from_project_graph_batch(self, mock_get_venv, mock_install, mock_extract):
+        """Test that the project root and unparsable specs stay out of the pip batch."""
+        venv_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, venv_path)
+        mock_get_venv.return_value = venv_path
+        mock_install.side_effect = lambda venv, specs, target: dict.fromkeys(specs, True)
+        mock_extract.return_value = []
+        
+        project_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, project_dir)
+        with open(os.path.join(project_dir, "requirements.txt"), "w") as f:
+            f.write("package1==1.0.0\npackage2\n")
+        with open(os.path.join(project_dir, "pyproject.toml"), "w") as f:
+            f.write('[tool.poetry.dependencies]\npython = "^3.8"\npackage3 = "^2.0.0"\n')
+        graph = DependencyGraphBuilder.from_project(project_dir)
+        
+        result = ModuleExtractor.extract_modules_from_dependency_graph(graph)
+        
+        mock_install.assert_called_once()
+        self.assertEqual(mock_install.call_args[0][1], ["package1==1.0.0", "package2"])
+        self.assertEqual(list(result), ["package1", "package2", "package3"])
+        self.assertEqual(result["package3"], [])
 
 
 if __name__ == '__main__':
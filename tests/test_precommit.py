@@ -0,0 +1,30 @@
+"""
+Tests for the pre-commit hook integration.
+"""
+from modguard.integrations.precommit import PreCommitHook
+from modguard.models.conflict import ConflictReport, ModuleInfo, PackageInfo
+
+
+def test_format_for_pre_commit():
+    """Test that only modules provided by several packages are listed."""
+    report = ConflictReport()
+    for module_name, package_name in [("utils", "package-a"), ("core", "package-a"), ("utils", "package-b")]:
+        package = PackageInfo(name=package_name, version="1.0.0")
+        report.add_conflict(module_name, ModuleInfo(name=module_name, path=f"/{package_name}/{module_name}.py",
+                                                    package=package))
+
+    output, exit_code = PreCommitHook.format_for_pre_commit(report)
+
+    assert exit_code == 1
+    assert output == (
+        "ModGuard detected 1 module conflicts:\n"
+        "\n"
+        "- Module 'utils' conflicts between: package-a (1.0.0), package-b (1.0.0)\n"
+        "\n"
+        "Run 'modguard scan . --fix' to apply automatic fixes."
+    )
+
+
+def test_format_for_pre_commit_without_conflicts():
+    """Test the output when no conflicts were found."""
+    assert PreCommitHook.format_for_pre_commit(ConflictReport()) == ("No module conflicts detected.", 0)
@@ -0,0 +1,78 @@
+"""
+Tests for the version resolver.
+"""
+from unittest import mock
+
+from modguard.dependency.resolver import DependencyResolver
+from modguard.fix.version_resolver import VersionResolver
+from modguard.models.conflict import ConflictReport, ModuleInfo, PackageInfo
+from modguard.models.fix_plan import FixType
+
+
+def _report(*conflicts):
+    """Build a conflict report from (module name, package name, version) triples."""
+    report = ConflictReport()
+    for module_name, package_name, version in conflicts:
+        package = PackageInfo(name=package_name, version=version)
+        report.add_conflict(module_name, ModuleInfo(name=module_name, path=f"/{package_name}/{module_name}.py",
+                                                    package=package))
+    return report
+
+
+def test_get_available_versions():
+    """Test that versions come from the PyPI JSON lookup, not a pip subprocess."""
+    with mock.patch.object(DependencyResolver, "get_available_versions",
+                           return_value=["3.0", "2.0", "1.0"]) as mock_lookup, \
+            mock.patch("subprocess.check_output") as mock_subprocess:
+        assert VersionResolver._get_available_versions("package-a", count=2) == ["3.0", "2.0"]
+
+    mock_lookup.assert_called_once_with("package-a")
+    mock_subprocess.assert_not_called()
+
+
+def test_suggest_version_fixes():
+    """Test suggesting the newest version of each conflicting package."""
+    report = _report(
+        ("utils", "package-a", "1.0.0"),
+        ("utils", "package-b", "2.0.0"),
+        ("helpers", "package-a", "1.0.0"),
+        ("helpers", "package-c", "3.0.0"),
+    )
+    versions = {
+        "package-a": ["1.1.0", "1.0.0"],
+        "package-b": ["2.0.0"],
+        "package-c": [],
+    }
+
+    with mock.patch.object(VersionResolver, "_get_available_versions",
+                           side_effect=lambda name: versions[name]) as mock_versions:
+        plan = VersionResolver.suggest_version_fixes(report)
+
+    # Every package is looked up once, even if it is part of several conflicts
+    assert sorted(call.args[0] for call in mock_versions.call_args_list) == ["package-a", "package-b", "package-c"]
+
+    assert [(a.module_name, a.package_name) for a in plan.actions] == [("utils", "package-a"), ("helpers", "package-a")]
+    assert all(a.fix_type == FixType.VERSION_CONSTRAINT for a in plan.actions)
+    assert plan.actions[0].details["new_version"] == "1.1.0"
+
+
+def test_suggest_version_fixes_without_conflicts():
+    """Test that nothing is looked up when no module is shared across packages."""
+    report = _report(("utils", "package-a", "1.0.0"))
+
+    with mock.patch.object(VersionResolver, "_get_available_versions") as mock_versions:
+        plan = VersionResolver.suggest_version_fixes(report)
+
+    assert plan.actions == []
+    mock_versions.assert_not_called()
+
+
+def test_compare_modules():
+    """Test reporting which modules of one version survive in another."""
+    old = PackageInfo(name="package-a", version="1.0.0")
+    new = PackageInfo(name="package-a", version="2.0.0")
+    v1 = [ModuleInfo(name=name, path=f"/v1/{name}.py", package=old) for name in ["utils", "helpers", "core"]]
+    v2 = [ModuleInfo(name=name, path=f"/v2/{name}.py", package=new) for name in ["core", "utils", "extra"]]
+
+    assert VersionResolver._compare_modules(v1, v2) == {"utils": True, "helpers": False, "core": True}
+    assert VersionResolver._compare_modules([], v2) == {}